@@ -24,7 +24,11 @@ class StandardClusterTests(unittest.TestCase):
         logging.basicConfig(level=logging.DEBUG)
         logger = logging.getLogger("hazelcast")
         logger.setLevel(logging.DEBUG)
-        cls.rc = HzRemoteController("127.0.0.1", 9701)
+        # The remote controller might be one of several launched by
+        # rc_supervisor.py, on a port of its own
+        cls.rc = HzRemoteController(
+            os.getenv("HZ_RC_HOST", "127.0.0.1"), int(os.getenv("HZ_RC_PORT", "9701"))
+        )
         cls.rc.loginToCloudUsingEnvironment()
 
 
@@ -1,13 +1,14 @@
 import argparse
+import sys
 
 from util import (
-    SNAPSHOT_REPO,
-    ENTERPRISE_SNAPSHOT_REPO,
-    RELEASE_REPO,
-    ENTERPRISE_RELEASE_REPO,
-    download_via_maven,
+    download_artifacts,
+    download_locked_artifacts,
+    get_server_artifact_requests,
+    get_server_lock_key,
+    load_lockfile,
     ServerKind,
-    DownloadFailedError,
+    set_mirror,
 )
 
 
@@ -44,31 +45,44 @@ def parse_args() -> argparse.Namespace:
         help="Directory to download JARs into",
     )
 
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    parser.add_argument(
+        "--lockfile",
+        dest="lockfile",
+        action="store",
+        type=str,
+        required=False,
+        help="Lockfile generated by generate_lockfile.py. When set, the JARs are "
+        "downloaded from their locked URLs and verified against their locked checksums",
+    )
+
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
     version = args.version
     dst = args.dst
     server_kind = ServerKind[args.server_kind.upper()]
 
-    if version.upper().endswith("-SNAPSHOT"):
-        repo = SNAPSHOT_REPO
-        enterprise_repo = ENTERPRISE_SNAPSHOT_REPO
-    else:
-        repo = RELEASE_REPO
-        enterprise_repo = ENTERPRISE_RELEASE_REPO
-
-    download_via_maven(repo, "hazelcast", version, dst, True)
-
-    try:
-        download_via_maven(repo, "hazelcast-sql", version, dst)
-    except DownloadFailedError:
-        # SQL JAR might not exist on 4.0.x
-        pass
+    if args.lockfile:
+        lock_key = get_server_lock_key(version, server_kind)
+        locked_artifacts = load_lockfile(args.lockfile).get(lock_key)
+        if locked_artifacts is None:
+            print("The lockfile does not have %s, resolving the JARs." % lock_key)
+        else:
+            download_locked_artifacts(locked_artifacts, dst)
+            sys.exit(0)
 
-    if server_kind == ServerKind.ENTERPRISE:
-        download_via_maven(enterprise_repo, "hazelcast-enterprise", version, dst)
-    else:
-        download_via_maven(repo, "hazelcast", version, dst)
+    download_artifacts(get_server_artifact_requests(version, server_kind), dst)
@@ -0,0 +1,100 @@
+import argparse
+import sys
+
+from util import (
+    ARTIFACT_CACHE_DIR,
+    ARTIFACT_CACHE_MAX_BYTES,
+    ARTIFACT_CACHE_PINNED_VERSIONS,
+    ArtifactCache,
+    get_server_matrix_versions,
+    parse_size,
+    parse_versions,
+    set_mirror,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Evicts the least recently used artifacts from the artifact cache "
+        "until it fits into the given size budget"
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        action="store",
+        type=str,
+        default=ARTIFACT_CACHE_DIR,
+        required=False,
+        help="Artifact cache directory. Defaults to the HZ_ARTIFACT_CACHE_DIR environment variable",
+    )
+
+    parser.add_argument(
+        "--max-bytes",
+        dest="max_bytes",
+        action="store",
+        type=str,
+        default=ARTIFACT_CACHE_MAX_BYTES,
+        required=False,
+        help="Size budget of the cache, with an optional K, M or G suffix. Defaults to the "
+        "HZ_ARTIFACT_CACHE_MAX_BYTES environment variable",
+    )
+
+    parser.add_argument(
+        "--pinned-versions",
+        dest="pinned_versions",
+        action="store",
+        type=str,
+        default=ARTIFACT_CACHE_PINNED_VERSIONS,
+        required=False,
+        help="Server versions whose artifacts are never evicted, as a comma separated list "
+        "or a JSON array. Defaults to the HZ_ARTIFACT_CACHE_PINNED_VERSIONS environment variable",
+    )
+
+    parser.add_argument(
+        "--minimum-version",
+        dest="minimum_version",
+        action="store",
+        type=str,
+        required=False,
+        help="When set, the versions of the current server matrix with this minimum "
+        "version are pinned as well",
+    )
+
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
+
+    if not args.cache_dir:
+        print("The artifact cache is disabled.")
+        sys.exit(0)
+
+    max_bytes = parse_size(args.max_bytes)
+    if not max_bytes:
+        print("A size budget must be given with --max-bytes.")
+        sys.exit(1)
+
+    pinned_versions = parse_versions(args.pinned_versions)
+    if args.minimum_version:
+        pinned_versions.extend(get_server_matrix_versions(args.minimum_version))
+
+    artifact_cache = ArtifactCache(args.cache_dir)
+    removed_count, freed_bytes = artifact_cache.collect_garbage(max_bytes, pinned_versions)
+    print(
+        "Removed %s artifacts and freed %s bytes. The cache now takes %s bytes."
+        % (removed_count, freed_bytes, artifact_cache.get_size())
+    )
@@ -0,0 +1,101 @@
+import argparse
+from typing import Dict, List
+
+from util import (
+    ArtifactRequest,
+    ServerKind,
+    get_rc_artifact_requests,
+    get_rc_lock_key,
+    get_server_artifact_requests,
+    get_server_lock_key,
+    get_server_matrix_versions,
+    lock_artifacts,
+    parse_server_kinds,
+    save_lockfile,
+    set_mirror,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Records the URLs, sizes and checksums of the JARs of the server matrix "
+        "and of the remote controller into a lockfile"
+    )
+
+    parser.add_argument(
+        "--minimum-version",
+        dest="minimum_version",
+        action="store",
+        type=str,
+        required=True,
+        help="Minimum server version of the server matrix",
+    )
+
+    parser.add_argument(
+        "--server-kinds",
+        dest="server_kinds",
+        action="store",
+        type=str,
+        default="os,enterprise",
+        required=False,
+        help="Comma separated server kinds to lock the JARs of",
+    )
+
+    parser.add_argument(
+        "--rc-version",
+        dest="rc_versions",
+        action="append",
+        type=str,
+        default=[],
+        required=False,
+        help="Remote controller version to lock the JAR of. Can be given multiple times",
+    )
+
+    parser.add_argument(
+        "--output",
+        dest="output",
+        action="store",
+        type=str,
+        required=True,
+        help="Lockfile to write",
+    )
+
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
+
+    requests_by_key: Dict[str, List[ArtifactRequest]] = {}
+    server_kinds = [ServerKind[kind.upper()] for kind in parse_server_kinds(args.server_kinds)]
+    for version in get_server_matrix_versions(args.minimum_version):
+        for server_kind in server_kinds:
+            requests_by_key[get_server_lock_key(version, server_kind)] = get_server_artifact_requests(
+                version, server_kind
+            )
+
+    for rc_version in args.rc_versions:
+        requests_by_key[get_rc_lock_key(rc_version)] = get_rc_artifact_requests(rc_version)
+
+    artifacts_by_key = lock_artifacts(requests_by_key)
+    save_lockfile(args.output, artifacts_by_key)
+    print(
+        "Locked %s JARs for %s artifact sets into %s."
+        % (
+            len({artifact.url for artifacts in artifacts_by_key.values() for artifact in artifacts}),
+            len(artifacts_by_key),
+            args.output,
+        )
+    )
@@ -1,21 +1,30 @@
 import argparse
 import json
+from typing import Dict, List, Optional, Union
 
 from util import (
+    AllClientsReleaseParser,
     ClientKind,
     ClientReleaseParser,
-    StableReleaseFilter,
-    SupportedReleaseFilter,
-    MajorVersionFilter,
-    Version,
+    MatrixState,
+    Release,
+    ReleaseIndex,
+    load_durations,
+    get_client_release_filters,
     get_tag,
-    get_latest_patch_releases,
+    parse_server_kinds,
+    shard_by_runtime,
+    set_mirror,
 )
 
+ALL_CLIENTS = "all"
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="Returns the client matrix for the selected option as a JSON array"
+        description="Returns the client matrix for the selected option as a JSON array. "
+        "When all clients are selected, returns a JSON object that maps each client "
+        "type to its matrix."
     )
 
     parser.add_argument(
@@ -23,43 +32,140 @@ def parse_args() -> argparse.Namespace:
         dest="client",
         action="store",
         type=str,
-        choices=[kind.name.lower() for kind in ClientKind],
+        choices=[kind.name.lower() for kind in ClientKind] + [ALL_CLIENTS],
         required=True,
         help="Client type",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
 
+    parser.add_argument(
+        "--state-file",
+        dest="state_file",
+        action="store",
+        type=str,
+        required=False,
+        help="JSON file that records the verified client, server and server kind combinations",
+    )
 
-if __name__ == "__main__":
-    args = parse_args()
-    client_kind = ClientKind[args.client.upper()]
-
-    if client_kind == ClientKind.GO:
-        filtered_major_version = [1]
-        unsupported_versions = [Version("1.0"), Version("1.1")]
-    elif client_kind == ClientKind.CPP:
-        filtered_major_version = [5]
-        unsupported_versions = [Version("5.0.0"), Version("5.1.0"), Version("5.2.0")]
-    elif client_kind == ClientKind.PY:
-        filtered_major_version = [5]
-        unsupported_versions = [Version("5.0.1"), Version("5.1")]
-    else:
-        filtered_major_version = [5]
-        unsupported_versions = []
+    parser.add_argument(
+        "--only-new",
+        dest="only_new",
+        action="store_true",
+        default=False,
+        required=False,
+        help="Only return the entries that have untested combinations in the state file",
+    )
 
-    filters = [
-        MajorVersionFilter(filtered_major_version),
-        StableReleaseFilter(),
-        SupportedReleaseFilter(unsupported_versions)
-    ]
+    parser.add_argument(
+        "--server-kinds",
+        dest="server_kinds",
+        action="store",
+        type=str,
+        default="os,enterprise",
+        required=False,
+        help="Comma separated server kinds each entry is tested against",
+    )
+
+    parser.add_argument(
+        "--server-version",
+        dest="server_version",
+        action="store",
+        type=str,
+        required=False,
+        help="Server version the clients are tested against, used along with --only-new",
+    )
+
+    parser.add_argument(
+        "--shards",
+        dest="shards",
+        action="store",
+        type=int,
+        required=False,
+        help="Number of shards to split the matrix into. When set, the output is a "
+        "JSON array of shards, each with a list of entries",
+    )
+
+    parser.add_argument(
+        "--durations",
+        dest="durations",
+        action="store",
+        type=str,
+        required=False,
+        help="JSON file that maps matrix entries to their past durations in seconds, "
+        "used to balance the predicted runtime of the shards",
+    )
 
-    client_release_parser = ClientReleaseParser(client_kind, filters)
-    releases = client_release_parser.get_all_releases()
+    args = parser.parse_args()
+    if args.only_new and not args.state_file:
+        parser.error("--only-new requires --state-file")
+    if args.only_new and args.client == ALL_CLIENTS:
+        # Client tags overlap across languages, so each of them has its own state file
+        parser.error("--only-new cannot be used with --client all")
+    if args.durations and not args.shards:
+        parser.error("--durations requires --shards")
+    if args.durations and args.client == ALL_CLIENTS:
+        # Durations are keyed by client tag, which overlap across languages
+        parser.error("--durations cannot be used with --client all")
 
-    releases = get_latest_patch_releases(releases)
+    return args
 
-    options = [
-        get_tag(release) for release in releases
+
+def get_matrix(
+    releases: List[Release],
+    state: Optional[MatrixState] = None,
+    server_kinds: Optional[List[str]] = None,
+    server_version: Optional[str] = None,
+) -> List[str]:
+    index = ReleaseIndex(releases)
+    tags = [
+        get_tag(release) for release in index.latest_patch_per_minor()
     ]
-    print(json.dumps(options))
+
+    if state:
+        tags = state.get_untested_client_tags(tags, server_kinds or [], server_version)
+
+    return tags
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
+
+    state = MatrixState(args.state_file) if args.only_new else None
+    server_kinds = parse_server_kinds(args.server_kinds)
+    durations = load_durations(args.durations) if args.durations else {}
+
+    def output(tags: List[str]) -> Union[List[str], List[Dict]]:
+        if args.shards:
+            return shard_by_runtime(tags, durations, args.shards)
+        return tags
+
+    if args.client == ALL_CLIENTS:
+        all_clients_release_parser = AllClientsReleaseParser(
+            {kind: get_client_release_filters(kind) for kind in ClientKind}
+        )
+        releases_by_kind = all_clients_release_parser.get_releases_by_kind()
+        options = {
+            kind.name.lower(): output(
+                get_matrix(releases, state, server_kinds, args.server_version)
+            )
+            for kind, releases in releases_by_kind.items()
+        }
+        print(json.dumps(options))
+    else:
+        client_kind = ClientKind[args.client.upper()]
+        client_release_parser = ClientReleaseParser(
+            client_kind, get_client_release_filters(client_kind)
+        )
+        releases = client_release_parser.get_all_releases()
+        print(json.dumps(output(get_matrix(releases, state, server_kinds, args.server_version))))
@@ -0,0 +1,142 @@
+import argparse
+import json
+import sys
+from typing import List, Tuple
+
+from util import (
+    ClientKind,
+    ClientReleaseParser,
+    ReleaseIndex,
+    get_client_release_filters,
+    get_server_matrix_versions,
+    get_tag,
+    parse_server_kinds,
+    select_pairwise_combinations,
+    set_mirror,
+)
+
+LATEST = "latest"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Returns a minimal client, server and server kind matrix as a JSON "
+        "array, that covers every client minor against every server minor, and both "
+        "of them against every server kind, at least once"
+    )
+
+    parser.add_argument(
+        "--client",
+        dest="client",
+        action="store",
+        type=str,
+        choices=[kind.name.lower() for kind in ClientKind],
+        required=True,
+        help="Client type",
+    )
+
+    parser.add_argument(
+        "--minimum-version",
+        dest="minimum_version",
+        action="store",
+        type=str,
+        required=True,
+        help="Minimum server version",
+    )
+
+    parser.add_argument(
+        "--server-kinds",
+        dest="server_kinds",
+        action="store",
+        type=str,
+        default="os,enterprise",
+        required=False,
+        help="Comma separated server kinds to test against",
+    )
+
+    parser.add_argument(
+        "--pin",
+        dest="pins",
+        action="append",
+        type=str,
+        default=[],
+        required=False,
+        help="Combination that must always be tested, in the CLIENT_TAG,SERVER_VERSION[,SERVER_KIND] "
+        "form. The client tag and server version can be 'latest', and all server kinds are used "
+        "when it is omitted. The latest client is always pinned against the latest server. "
+        "Can be given multiple times",
+    )
+
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    return parser.parse_args()
+
+
+def parse_pin(
+    pin: str, client_tags: List[str], server_versions: List[str], server_kinds: List[str]
+) -> List[Tuple[str, str, str]]:
+    parts = pin.split(",")
+    if len(parts) not in (2, 3):
+        raise ValueError("Cannot parse the pinned combination %s" % pin)
+
+    client_tag = client_tags[0] if parts[0] == LATEST else parts[0]
+    server_version = server_versions[0] if parts[1] == LATEST else parts[1]
+    kinds = parse_server_kinds(parts[2]) if len(parts) == 3 else server_kinds
+    return [(client_tag, server_version, kind) for kind in kinds]
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
+
+    client_kind = ClientKind[args.client.upper()]
+    client_release_parser = ClientReleaseParser(
+        client_kind, get_client_release_filters(client_kind)
+    )
+    client_index = ReleaseIndex(client_release_parser.get_all_releases())
+    client_tags = [get_tag(release) for release in client_index.latest_patch_per_minor()]
+
+    server_versions = get_server_matrix_versions(args.minimum_version)
+
+    server_kinds = parse_server_kinds(args.server_kinds)
+
+    if not client_tags or not server_versions or not server_kinds:
+        print(json.dumps([]))
+        sys.exit(0)
+
+    pinned = []
+    for pin in [LATEST + "," + LATEST] + args.pins:
+        pinned.extend(parse_pin(pin, client_tags, server_versions, server_kinds))
+
+    combinations = select_pairwise_combinations(
+        [client_tags, server_versions, server_kinds], pinned
+    )
+
+    full_product_size = len(client_tags) * len(server_versions) * len(server_kinds)
+    print(
+        "Selected %s of %s combinations, saving %s CI jobs."
+        % (len(combinations), full_product_size, max(0, full_product_size - len(combinations))),
+        file=sys.stderr,
+    )
+
+    print(
+        json.dumps(
+            [
+                {
+                    "client_tag": client_tag,
+                    "server_version": server_version,
+                    "server_kind": server_kind,
+                }
+                for client_tag, server_version, server_kind in combinations
+            ]
+        )
+    )
@@ -1,12 +1,13 @@
 import argparse
 import json
-from typing import List
 
 from util import (
-    MajorMinorVersionFilter,
-    ServerReleaseParser,
-    get_latest_patch_releases,
-    ReleaseFilter
+    get_server_matrix_versions,
+    load_durations,
+    MatrixState,
+    parse_server_kinds,
+    shard_by_runtime,
+    set_mirror,
 )
 
 
@@ -24,18 +25,98 @@ def parse_args() -> argparse.Namespace:
         help="Minimum server version",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    parser.add_argument(
+        "--state-file",
+        dest="state_file",
+        action="store",
+        type=str,
+        required=False,
+        help="JSON file that records the verified client, server and server kind combinations",
+    )
+
+    parser.add_argument(
+        "--only-new",
+        dest="only_new",
+        action="store_true",
+        default=False,
+        required=False,
+        help="Only return the entries that have untested combinations in the state file",
+    )
+
+    parser.add_argument(
+        "--server-kinds",
+        dest="server_kinds",
+        action="store",
+        type=str,
+        default="os,enterprise",
+        required=False,
+        help="Comma separated server kinds each entry is tested against",
+    )
+
+    parser.add_argument(
+        "--client-tag",
+        dest="client_tag",
+        action="store",
+        type=str,
+        required=False,
+        help="Client tag the server versions are tested against, used along with --only-new",
+    )
+
+    parser.add_argument(
+        "--shards",
+        dest="shards",
+        action="store",
+        type=int,
+        required=False,
+        help="Number of shards to split the matrix into. When set, the output is a "
+        "JSON array of shards, each with a list of entries",
+    )
+
+    parser.add_argument(
+        "--durations",
+        dest="durations",
+        action="store",
+        type=str,
+        required=False,
+        help="JSON file that maps matrix entries to their past durations in seconds, "
+        "used to balance the predicted runtime of the shards",
+    )
+
+    args = parser.parse_args()
+    if args.only_new and not args.state_file:
+        parser.error("--only-new requires --state-file")
+    if args.durations and not args.shards:
+        parser.error("--durations requires --shards")
+
+    return args
 
 
 if __name__ == "__main__":
     args = parse_args()
-    minimum_major_version, minimum_minor_version = map(int, args.minimum_version.split("."))
-    filters: List[ReleaseFilter] = [MajorMinorVersionFilter((minimum_major_version, minimum_minor_version))]
-    server_release_parser = ServerReleaseParser(filters)
-    releases = server_release_parser.get_all_releases()
-    latest_patch_releases = get_latest_patch_releases(releases)
-    latest_patch_release_strings = [
-        r.version.version_str for r in latest_patch_releases
-    ]
-
-    print(json.dumps(latest_patch_release_strings))
+    if args.mirror:
+        set_mirror(args.mirror)
+    latest_patch_release_strings = get_server_matrix_versions(args.minimum_version)
+
+    if args.only_new:
+        state = MatrixState(args.state_file)
+        latest_patch_release_strings = state.get_untested_server_versions(
+            latest_patch_release_strings,
+            parse_server_kinds(args.server_kinds),
+            args.client_tag,
+        )
+
+    if args.shards:
+        durations = load_durations(args.durations) if args.durations else {}
+        print(json.dumps(shard_by_runtime(latest_patch_release_strings, durations, args.shards)))
+    else:
+        print(json.dumps(latest_patch_release_strings))
@@ -0,0 +1,251 @@
+import gzip
+import http.client
+import io
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+# HTTP client shared by the scripts, which keeps the connections alive and
+# reuses them for the following requests to the same host, saving a TCP and
+# TLS handshake per request. Local files and proxied URLs are opened with
+# urllib, which raises the same errors.
+
+MAX_IDLE_CONNECTIONS_PER_HOST = 8
+MAX_REDIRECTS = 10
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Errors that a reused connection fails with when the server closed it
+# while it was idle. The request is sent again on a new connection.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+PoolKey = Tuple[str, str, Optional[int]]
+
+
+class ConnectionPool:
+    def __init__(self, max_idle_connections_per_host: int = MAX_IDLE_CONNECTIONS_PER_HOST):
+        self._max_idle_connections_per_host = max_idle_connections_per_host
+        self._idle_connections: Dict[PoolKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def acquire(
+        self, key: PoolKey, timeout: Optional[float]
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        # Returns a connection to the host, and whether it was reused
+        with self._lock:
+            idle_connections = self._idle_connections.get(key)
+            connection = idle_connections.pop() if idle_connections else None
+
+        if connection is not None:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            return connection, True
+
+        scheme, host, port = key
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self._ssl_context
+            )
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        return connection, False
+
+    def release(self, key: PoolKey, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle_connections = self._idle_connections.setdefault(key, [])
+            if len(idle_connections) < self._max_idle_connections_per_host:
+                idle_connections.append(connection)
+                return
+
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle_connections = self._idle_connections
+            self._idle_connections = {}
+
+        for connections in idle_connections.values():
+            for connection in connections:
+                connection.close()
+
+
+class PooledResponse(io.BufferedIOBase):
+    # Mimics the responses of urllib. The connection goes back to the pool
+    # once the body is read to the end, and is closed if the response is
+    # closed before that.
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        key: PoolKey,
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        url: str,
+        method: str = "GET",
+    ):
+        super().__init__()
+        self._pool = pool
+        self._key = key
+        self._connection: Optional[http.client.HTTPConnection] = connection
+        self._response = response
+        self._decoded: Optional[io.BytesIO] = None
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+        if (self.headers.get("Content-Encoding") or "").lower() == "gzip":
+            # Feeds are small, so they are decompressed at once
+            self._decoded = io.BytesIO(gzip.decompress(response.read()))
+            del self.headers["Content-Encoding"]
+            del self.headers["Content-Length"]
+            self._release()
+        elif method == "HEAD":
+            # There is no body to wait for, the connection can be reused
+            # right away
+            response.read()
+            self._release()
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            size = -1
+
+        if self._decoded is not None:
+            return self._decoded.read(size)
+
+        if self._connection is None:
+            return b""
+
+        data = self._response.read() if size == -1 else self._response.read(size)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def read1(self, size: Optional[int] = -1) -> bytes:
+        return self.read(size)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            # The rest of the body is still on the connection
+            self._response.close()
+            self._connection.close()
+            self._connection = None
+        super().close()
+
+    def _release(self) -> None:
+        connection = self._connection
+        self._connection = None
+        if connection is None:
+            return
+
+        if self._response.will_close:
+            connection.close()
+        else:
+            self._pool.release(self._key, connection)
+
+
+_DEFAULT_POOL = ConnectionPool()
+
+
+def get_default_pool() -> ConnectionPool:
+    return _DEFAULT_POOL
+
+
+def _is_proxied(url: str) -> bool:
+    parsed_url = urlparse(url)
+    proxies = urllib.request.getproxies()
+    return parsed_url.scheme in proxies and not urllib.request.proxy_bypass(parsed_url.hostname or "")
+
+
+def urlopen(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    method: str = "GET",
+    timeout: Optional[float] = None,
+    accept_gzip: bool = False,
+    pool: Optional[ConnectionPool] = None,
+):
+    # Opens the URL like urllib.request.urlopen, raising HTTPError for the
+    # error statuses and URLError when the host cannot be reached. Gzip
+    # compression is only requested when asked for, as it is pointless for
+    # JARs and would break range requests, and only on pooled connections,
+    # as urllib does not decompress the responses.
+    headers = dict(headers or {})
+    if urlparse(url).scheme not in ("http", "https") or _is_proxied(url):
+        request = urllib.request.Request(url, headers=headers, method=method)
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    if accept_gzip:
+        headers["Accept-Encoding"] = "gzip"
+
+    pool = pool or _DEFAULT_POOL
+    for _ in range(MAX_REDIRECTS + 1):
+        response = _send(pool, url, headers, method, timeout)
+        location = response.headers.get("Location")
+        if response.status in REDIRECT_STATUSES and location:
+            response.read()
+            response.close()
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = "GET"
+            continue
+
+        if response.status >= 300:
+            body = response.read()
+            response.close()
+            raise urllib.error.HTTPError(
+                url, response.status, response.reason, response.headers, io.BytesIO(body)
+            )
+
+        return response
+
+    raise urllib.error.URLError("Too many redirects for %s" % url)
+
+
+def _send(
+    pool: ConnectionPool,
+    url: str,
+    headers: Dict[str, str],
+    method: str,
+    timeout: Optional[float],
+) -> PooledResponse:
+    parsed_url = urlparse(url)
+    key: PoolKey = (parsed_url.scheme, parsed_url.hostname or "", parsed_url.port)
+    target = parsed_url.path or "/"
+    if parsed_url.query:
+        target += "?" + parsed_url.query
+
+    while True:
+        connection, reused = pool.acquire(key, timeout)
+        try:
+            connection.request(method, target, headers=headers)
+            response = connection.getresponse()
+        except STALE_CONNECTION_ERRORS as e:
+            connection.close()
+            if reused:
+                continue
+            raise urllib.error.URLError(e) from e
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            if isinstance(e, urllib.error.URLError):
+                raise
+            raise urllib.error.URLError(e) from e
+
+        return PooledResponse(pool, key, connection, response, url, method)
@@ -0,0 +1,62 @@
+import argparse
+
+from util import (
+    MatrixState,
+    ServerKind,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Records a verified client, server and server kind combination "
+        "in the matrix state file"
+    )
+
+    parser.add_argument(
+        "--state-file",
+        dest="state_file",
+        action="store",
+        type=str,
+        required=True,
+        help="JSON file that records the verified combinations",
+    )
+
+    parser.add_argument(
+        "--client-tag",
+        dest="client_tag",
+        action="store",
+        type=str,
+        required=True,
+        help="Tag of the verified client",
+    )
+
+    parser.add_argument(
+        "--server-version",
+        dest="server_version",
+        action="store",
+        type=str,
+        required=True,
+        help="Version of the verified server",
+    )
+
+    parser.add_argument(
+        "--server-kind",
+        dest="server_kind",
+        action="store",
+        type=str,
+        required=True,
+        choices=[kind.name.lower() for kind in ServerKind],
+        help="Kind of the verified server",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    state = MatrixState(args.state_file)
+    # Other jobs might have recorded combinations since the state was read
+    with state.lock():
+        state.reload()
+        state.mark_verified(args.client_tag, args.server_version, args.server_kind)
+        state.save()
@@ -0,0 +1,455 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+from typing import Dict, List, Optional, Tuple
+
+from start_rc import (
+    DEFAULT_JVM_LAUNCH_PROFILE,
+    JVM_LAUNCH_PROFILES,
+    RC_PORT,
+    RemoteControllerExitedError,
+    exit_rc,
+    get_class_path,
+    get_rc_args,
+    launch_rc,
+    ping_rc,
+    wait_until_rc_is_ready,
+)
+from util import (
+    DownloadFailedError,
+    ServerKind,
+    download_artifacts,
+    get_rc_artifact_requests,
+    get_server_artifact_requests,
+    set_mirror,
+)
+
+RC_HOST = "127.0.0.1"
+RC_ENDPOINTS_FILE = "rc_endpoints.json"
+RC_SHUTDOWN_TIMEOUT = 30
+PORT_PLACEHOLDER = "{port}"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Launches several remote controllers on free ports, each with its own "
+        "server version or JARs folder, and shuts them all down once the given command, "
+        "or the supervisor itself, exits"
+    )
+
+    parser.add_argument(
+        "--server-version",
+        dest="server_versions",
+        action="append",
+        type=str,
+        default=[],
+        required=False,
+        help="Server version to launch a remote controller for. Can be given multiple times",
+    )
+
+    parser.add_argument(
+        "--server-kind",
+        dest="server_kind",
+        action="store",
+        type=str,
+        default="os",
+        choices=[kind.name.lower() for kind in ServerKind],
+        required=False,
+        help="The Hazelcast server type of the server versions",
+    )
+
+    parser.add_argument(
+        "--jars",
+        dest="jars",
+        action="append",
+        type=str,
+        default=[],
+        required=False,
+        help="Folder with the JARs of a remote controller to launch, including the remote "
+        "controller JAR. Can be given multiple times",
+    )
+
+    parser.add_argument(
+        "--rc-version",
+        dest="rc_version",
+        action="store",
+        type=str,
+        default="0.8-SNAPSHOT",
+        required=False,
+        help="Remote controller version to download for the server versions",
+    )
+
+    parser.add_argument(
+        "--work-dir",
+        dest="work_dir",
+        action="store",
+        type=str,
+        default="rc_instances",
+        required=False,
+        help="Directory that holds the JARs and logs of each remote controller",
+    )
+
+    parser.add_argument(
+        "--endpoints-file",
+        dest="endpoints_file",
+        action="store",
+        type=str,
+        default=RC_ENDPOINTS_FILE,
+        required=False,
+        help="JSON file to write the endpoints of the remote controllers into",
+    )
+
+    # The remote controller listens on 9701 unless told otherwise, and the
+    # way to tell it depends on its version, so there is no default
+    parser.add_argument(
+        "--port-args-template",
+        dest="port_args_template",
+        action="store",
+        type=str,
+        required=True,
+        help="Arguments that make a remote controller listen on the port given as {port}, "
+        "such as a program argument or a -D system property, passed with = as in "
+        "--port-args-template=-D<property>={port}. JVM options, starting with -D or -X, are "
+        "put before the main class, and the others after it",
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store",
+        type=str,
+        default=DEFAULT_JVM_LAUNCH_PROFILE,
+        choices=list(JVM_LAUNCH_PROFILES),
+        required=False,
+        help="JVM launch profile of the remote controllers",
+    )
+
+    parser.add_argument(
+        "--use-simple-server",
+        dest="use_simple_server",
+        action="store_true",
+        default=False,
+        required=False,
+        help="Use the remote controllers in simple server mode",
+    )
+
+    parser.add_argument(
+        "--each",
+        dest="each",
+        action="store_true",
+        default=False,
+        required=False,
+        help="Run the command once per remote controller, concurrently, with HZ_RC_HOST and "
+        "HZ_RC_PORT pointing to it. Its output is written into the directory of the instance",
+    )
+
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="Command to run once the remote controllers are ready, after --",
+    )
+
+    args = parser.parse_args()
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.server_versions and not args.jars:
+        parser.error("At least one --server-version or --jars is required")
+    if args.each and not args.command:
+        parser.error("--each requires a command")
+    if PORT_PLACEHOLDER not in args.port_args_template:
+        parser.error("--port-args-template must contain " + PORT_PLACEHOLDER)
+
+    return args
+
+
+class RemoteControllerInstance:
+    def __init__(
+        self,
+        name: str,
+        jars_dir: str,
+        server_kind: ServerKind,
+        server_version: Optional[str] = None,
+    ):
+        self.name = name
+        self.jars_dir = path.abspath(jars_dir)
+        self.server_kind = server_kind
+        self.server_version = server_version
+        self.instance_dir = ""
+        self.port = 0
+        self.process: Optional[subprocess.Popen] = None
+        self.is_ready = False
+
+    @property
+    def stdout_log(self) -> str:
+        return path.join(self.instance_dir, "rc_stdout.log")
+
+    @property
+    def stderr_log(self) -> str:
+        return path.join(self.instance_dir, "rc_stderr.log")
+
+    def to_json(self) -> Dict:
+        return {
+            "name": self.name,
+            "server_version": self.server_version,
+            "server_kind": self.server_kind.name.lower(),
+            "host": RC_HOST,
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+        }
+
+    def get_env(self) -> Dict[str, str]:
+        env = {
+            "HZ_RC_NAME": self.name,
+            "HZ_RC_HOST": RC_HOST,
+            "HZ_RC_PORT": str(self.port),
+        }
+        if self.server_version:
+            env["HZ_VERSION"] = self.server_version
+        return env
+
+
+class RemoteControllerPortError(Exception):
+    pass
+
+
+class RemoteControllerStartupCancelledError(Exception):
+    pass
+
+
+def find_free_ports(count: int) -> List[int]:
+    # The sockets are kept open until all the ports are found, so that the
+    # same port is not returned twice. The default port of the remote
+    # controller is skipped, so that it can tell when the port arguments
+    # are ignored.
+    sockets = []
+    try:
+        while len(sockets) < count:
+            sock = socket.socket()
+            sock.bind((RC_HOST, 0))
+            if sock.getsockname()[1] == RC_PORT:
+                sock.close()
+                continue
+            sockets.append(sock)
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def get_port_args(port_args_template: str, port: int) -> Tuple[List[str], List[str]]:
+    # Returns the JVM options and the program arguments of the template
+    port_args = port_args_template.replace(PORT_PLACEHOLDER, str(port)).split()
+    jvm_options = [arg for arg in port_args if arg.startswith(("-D", "-X"))]
+    program_args = [arg for arg in port_args if not arg.startswith(("-D", "-X"))]
+    return jvm_options, program_args
+
+
+def prepare_instances(args: argparse.Namespace) -> List[RemoteControllerInstance]:
+    server_kind = ServerKind[args.server_kind.upper()]
+    instances = []
+    for server_version in args.server_versions:
+        name = "%s-%s" % (server_version, server_kind.name.lower())
+        jars_dir = path.join(args.work_dir, name, "jars")
+        requests = get_server_artifact_requests(server_version, server_kind)
+        requests += get_rc_artifact_requests(args.rc_version)
+        download_artifacts(requests, jars_dir)
+        instances.append(RemoteControllerInstance(name, jars_dir, server_kind, server_version))
+
+    for jars_dir in args.jars:
+        name = path.basename(path.normpath(jars_dir))
+        instances.append(RemoteControllerInstance(name, jars_dir, server_kind))
+
+    names = [instance.name for instance in instances]
+    for instance in instances:
+        if names.count(instance.name) > 1:
+            instance.name += "-%s" % names.index(instance.name)
+            names = [instance.name for instance in instances]
+        instance.instance_dir = path.abspath(path.join(args.work_dir, instance.name))
+        os.makedirs(instance.instance_dir, exist_ok=True)
+
+    return instances
+
+
+def launch_instances(instances: List[RemoteControllerInstance], args: argparse.Namespace) -> None:
+    # A remote controller that answers on the default port, while none did
+    # before the launch, ignored the port arguments
+    default_port_was_free = not ping_rc(RC_HOST, RC_PORT)
+    for instance, port in zip(instances, find_free_ports(len(instances))):
+        instance.port = port
+        port_jvm_options, port_program_args = get_port_args(args.port_args_template, port)
+        rc_args = get_rc_args(
+            get_class_path(instance.jars_dir),
+            args.use_simple_server,
+            instance.server_kind,
+            JVM_LAUNCH_PROFILES[args.profile] + port_jvm_options,
+        )
+        rc_args += port_program_args
+        instance.process = launch_rc(rc_args, instance.stdout_log, instance.stderr_log, instance.instance_dir)
+
+    # The first failure cancels the other waits, instead of letting them run
+    # until their timeout
+    cancelled = threading.Event()
+
+    def check() -> None:
+        if cancelled.is_set():
+            raise RemoteControllerStartupCancelledError()
+        if default_port_was_free and ping_rc(RC_HOST, RC_PORT):
+            raise RemoteControllerPortError(
+                "A remote controller answers on the default port %s instead of its assigned "
+                "port, so it ignored the port arguments %r. Pass the port option of this remote "
+                "controller version with --port-args-template." % (RC_PORT, args.port_args_template)
+            )
+
+    def wait(instance: RemoteControllerInstance) -> None:
+        try:
+            wait_until_rc_is_ready(
+                RC_HOST,
+                instance.port,
+                stdout_log=instance.stdout_log,
+                process=instance.process,
+                stderr_log=instance.stderr_log,
+                check=check,
+            )
+        except Exception:
+            cancelled.set()
+            raise
+        instance.is_ready = True
+        print("Remote controller %s is ready on port %s." % (instance.name, instance.port))
+
+    with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+        futures = [executor.submit(wait, instance) for instance in instances]
+
+    errors = [
+        future.exception()
+        for future in futures
+        if future.exception() and not isinstance(future.exception(), RemoteControllerStartupCancelledError)
+    ]
+    if errors:
+        raise errors[0]
+
+
+def shutdown_instances(instances: List[RemoteControllerInstance]) -> None:
+    def shutdown(instance: RemoteControllerInstance) -> None:
+        process = instance.process
+        if process is None or process.poll() is not None:
+            return
+
+        # Remote controllers that are not ready cannot be asked to exit
+        if instance.is_ready:
+            exit_rc(RC_HOST, instance.port)
+            try:
+                process.wait(RC_SHUTDOWN_TIMEOUT)
+                return
+            except subprocess.TimeoutExpired:
+                print("Remote controller %s did not exit, terminating it." % instance.name)
+
+        process.terminate()
+        try:
+            process.wait(RC_SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    if instances:
+        with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+            list(executor.map(shutdown, instances))
+
+
+def write_endpoints(instances: List[RemoteControllerInstance], endpoints_file: str) -> str:
+    endpoints = json.dumps([instance.to_json() for instance in instances])
+    with open(endpoints_file, "w") as f:
+        f.write(endpoints + "\n")
+    return endpoints
+
+
+def run_command(instances: List[RemoteControllerInstance], command: List[str], endpoints: str) -> int:
+    env = dict(os.environ)
+    env["HZ_RC_ENDPOINTS"] = endpoints
+    # The first remote controller is the default one of the tests
+    env.update(instances[0].get_env())
+    return subprocess.call(command, env=env)
+
+
+def run_command_for_each(instances: List[RemoteControllerInstance], command: List[str], endpoints: str) -> int:
+    def run(instance: RemoteControllerInstance) -> int:
+        env = dict(os.environ)
+        env["HZ_RC_ENDPOINTS"] = endpoints
+        env.update(instance.get_env())
+        with open(path.join(instance.instance_dir, "command.log"), "w") as output:
+            return subprocess.call(command, env=env, stdout=output, stderr=subprocess.STDOUT)
+
+    with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+        return_codes = list(executor.map(run, instances))
+
+    for instance, return_code in zip(instances, return_codes):
+        print(
+            "Command for %s exited with code %s, see %s"
+            % (instance.name, return_code, path.join(instance.instance_dir, "command.log"))
+        )
+    return max(return_codes, key=abs)
+
+
+def wait_for_signal() -> None:
+    print("Press Ctrl+C, or send SIGTERM, to shut the remote controllers down.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+def raise_keyboard_interrupt(*_) -> None:
+    raise KeyboardInterrupt()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
+
+    try:
+        instances = prepare_instances(args)
+    except DownloadFailedError:
+        sys.exit(1)
+
+    # SIGTERM, as sent by the CI runners on cancellation, shuts the remote
+    # controllers down like Ctrl+C does
+    signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+    exit_code = 0
+    try:
+        launch_instances(instances, args)
+        endpoints = write_endpoints(instances, args.endpoints_file)
+        print("Wrote the endpoints of the remote controllers to " + args.endpoints_file)
+        if not args.command:
+            wait_for_signal()
+        elif args.each:
+            exit_code = run_command_for_each(instances, args.command, endpoints)
+        else:
+            exit_code = run_command(instances, args.command, endpoints)
+    except (RemoteControllerExitedError, RemoteControllerPortError) as e:
+        print(e)
+        exit_code = 1
+    except KeyboardInterrupt:
+        exit_code = 130
+    finally:
+        shutdown_instances(instances)
+
+    sys.exit(exit_code)
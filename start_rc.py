@@ -1,18 +1,91 @@
 import argparse
+import hashlib
+import json
 import os
+import platform
+import re
+import shutil
 import socket
+import struct
 import subprocess
+import sys
+import threading
 import time
+from collections import deque
 from contextlib import closing
 from os import path
+from typing import Callable, Dict, List, Optional, Tuple
 
 from util import (
+    CLASS_PATH_SEPARATOR,
     ENTERPRISE_SNAPSHOT_REPO,
+    download_locked_artifacts,
     download_via_maven,
+    get_rc_lock_key,
     IS_ON_WINDOWS,
+    load_lockfile,
     ServerKind,
+    set_mirror,
 )
 
+RC_HOST = "localhost"
+RC_PORT = 9701
+RC_STARTUP_TIMEOUT = 300
+RC_STDOUT_LOG = "rc_stdout.log"
+RC_STDERR_LOG = "rc_stderr.log"
+
+# Readiness is probed with exponentially growing delays, and probed again
+# right away when the remote controller writes to its log.
+READINESS_INITIAL_DELAY = 0.05
+READINESS_MAX_DELAY = 1
+READINESS_LOG_POLL_INTERVAL = 0.01
+PING_TIMEOUT = 5
+# Number of lines of rc_stderr.log reported when the remote controller exits
+RC_STDERR_TAIL_LINES = 30
+
+# Class data sharing archives of the classes loaded by the remote controller
+# are created with a training run that exits once it is ready. Dynamic
+# archives require Java 13 or newer.
+CDS_MIN_JAVA_VERSION = 13
+CDS_TRAINING_EXIT_TIMEOUT = 60
+
+# JVM options of the named launch profiles of the remote controller. The
+# members it starts run in the same JVM, so the heap is sized relative to
+# the memory of the runner instead of being fixed.
+JVM_LAUNCH_PROFILES: Dict[str, List[str]] = {
+    "default": [],
+    "fast-start": [
+        "-XX:TieredStopAtLevel=1",
+        "-XX:+UseSerialGC",
+        "-Xshare:auto",
+    ],
+    "low-memory": [
+        "-XX:+UseSerialGC",
+        "-XX:MaxRAMPercentage=25",
+        "-XX:MaxMetaspaceSize=256m",
+        "-XX:ReservedCodeCacheSize=64m",
+        "-Xss512k",
+    ],
+    "throughput": [
+        "-XX:+UseParallelGC",
+        "-XX:MaxRAMPercentage=75",
+    ],
+}
+DEFAULT_JVM_LAUNCH_PROFILE = "default"
+RC_LAUNCH_REPORT = "rc_launch_report.json"
+GC_TIME_MONITOR_EXIT_TIMEOUT = 10
+
+# The remote controller serves Thrift with the binary protocol over a
+# buffered socket. A ping call is a strict message header, the method
+# name, the sequence id and an empty argument struct, and its reply is a
+# struct with the boolean result as field 0.
+THRIFT_VERSION_1 = 0x80010000
+THRIFT_VERSION_MASK = 0xFFFF0000
+THRIFT_CALL = 1
+THRIFT_REPLY = 2
+THRIFT_STOP = 0
+THRIFT_BOOL = 2
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Starts the remote controller")
@@ -54,17 +127,93 @@ def parse_args() -> argparse.Namespace:
         help="Use the RC in simple server mode",
     )
 
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        action="store",
+        type=str,
+        required=False,
+        help="Local directory or URL of a mirror of the release feeds and Maven "
+        "repositories. Overrides the HZ_MIRROR environment variable",
+    )
+
+    parser.add_argument(
+        "--lockfile",
+        dest="lockfile",
+        action="store",
+        type=str,
+        required=False,
+        help="Lockfile generated by generate_lockfile.py. When set, the remote controller "
+        "JAR is downloaded from its locked URL and verified against its locked checksum",
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store",
+        type=str,
+        default=DEFAULT_JVM_LAUNCH_PROFILE,
+        choices=list(JVM_LAUNCH_PROFILES),
+        required=False,
+        help="JVM launch profile of the remote controller",
+    )
+
+    parser.add_argument(
+        "--report",
+        dest="report",
+        action="store",
+        type=str,
+        default=RC_LAUNCH_REPORT,
+        required=False,
+        help="JSON file to write the time to ready, peak RSS and GC time of the launch into",
+    )
+
+    parser.add_argument(
+        "--cds",
+        dest="cds",
+        action="store_true",
+        default=False,
+        required=False,
+        help="Launch the remote controller with an AppCDS archive of its classes. The archive "
+        "is created on the first run with a training run, and stored in the JARs folder",
+    )
+
     return parser.parse_args()
 
 
-def start_rc(
-    rc_version: str, dst_folder: str, use_simple_server: bool, server_kind: ServerKind
-) -> None:
+def download_rc(rc_version: str, dst_folder: str, lockfile: Optional[str]) -> None:
+    if lockfile:
+        lock_key = get_rc_lock_key(rc_version)
+        locked_artifacts = load_lockfile(lockfile).get(lock_key)
+        if locked_artifacts is not None:
+            download_locked_artifacts(locked_artifacts, dst_folder)
+            return
+        print("The lockfile does not have %s, resolving the JAR." % lock_key)
+
     download_via_maven(ENTERPRISE_SNAPSHOT_REPO, "hazelcast-remote-controller", rc_version, dst_folder)
-    class_path = path.join(dst_folder, "*")
 
-    args = [
-        "java",
+
+def get_class_path(dst_folder: str) -> str:
+    # The JARs are listed explicitly and in a stable order, as class data
+    # sharing archives are only valid for the class path they were created
+    # with.
+    jars = sorted(name for name in os.listdir(dst_folder) if name.endswith(".jar"))
+    return CLASS_PATH_SEPARATOR.join(path.join(dst_folder, name) for name in jars)
+
+
+def get_rc_args(
+    class_path: str,
+    use_simple_server: bool,
+    server_kind: ServerKind,
+    jvm_options: Optional[List[str]] = None,
+) -> List[str]:
+    args = ["java"] + (jvm_options or [])
+
+    enterprise_key = os.environ.get("HAZELCAST_ENTERPRISE_KEY", None)
+    if server_kind == ServerKind.ENTERPRISE and enterprise_key:
+        args.append("-Dhazelcast.enterprise.license.key=" + enterprise_key)
+
+    args += [
         "-cp",
         class_path,
         "com.hazelcast.remotecontroller.Main",
@@ -73,33 +222,499 @@ def start_rc(
     if use_simple_server:
         args.append("--use-simple-server")
 
-    enterprise_key = os.environ.get("HAZELCAST_ENTERPRISE_KEY", None)
-    if server_kind == ServerKind.ENTERPRISE and enterprise_key:
-        args.insert(1, "-Dhazelcast.enterprise.license.key=" + enterprise_key)
+    return args
 
-    rc_stdout = open("rc_stdout.log", "w")
-    rc_stderr = open("rc_stderr.log", "w")
 
-    subprocess.Popen(args=args, stdout=rc_stdout, stderr=rc_stderr, shell=IS_ON_WINDOWS)
+def launch_rc(
+    args: List[str],
+    stdout_log: str = RC_STDOUT_LOG,
+    stderr_log: str = RC_STDERR_LOG,
+    cwd: Optional[str] = None,
+) -> subprocess.Popen:
+    with open(stdout_log, "w") as rc_stdout, open(stderr_log, "w") as rc_stderr:
+        return subprocess.Popen(
+            args=args, stdout=rc_stdout, stderr=rc_stderr, cwd=cwd, shell=IS_ON_WINDOWS
+        )
+
+
+def start_rc(
+    rc_version: str,
+    dst_folder: str,
+    use_simple_server: bool,
+    server_kind: ServerKind,
+    lockfile: Optional[str] = None,
+    use_cds: bool = False,
+    profile: str = DEFAULT_JVM_LAUNCH_PROFILE,
+) -> Tuple[subprocess.Popen, Optional["CdsArchive"]]:
+    download_rc(rc_version, dst_folder, lockfile)
+    class_path = get_class_path(dst_folder)
+    jvm_options = list(JVM_LAUNCH_PROFILES[profile])
+
+    cds_archive = None
+    if use_cds:
+        cds_archive = get_or_create_cds_archive(
+            dst_folder,
+            class_path,
+            jvm_options,
+            get_rc_args(class_path, use_simple_server, server_kind, jvm_options),
+        )
+
+    if cds_archive:
+        jvm_options += cds_archive.get_jvm_options()
+    args = get_rc_args(class_path, use_simple_server, server_kind, jvm_options)
+    return launch_rc(args), cds_archive
+
+
+class RemoteControllerExitedError(Exception):
+    pass
+
+
+def read_log_tail(log_path: str, line_count: int = RC_STDERR_TAIL_LINES) -> str:
+    try:
+        with open(log_path, "r", errors="replace") as f:
+            return "".join(deque(f, maxlen=line_count))
+    except OSError:
+        return ""
+
+
+def check_rc_is_alive(
+    process: Optional[subprocess.Popen], stderr_log: Optional[str] = RC_STDERR_LOG
+) -> None:
+    if process is None or process.poll() is None:
+        return
+
+    if stderr_log is None:
+        raise RemoteControllerExitedError(
+            "Remote controller exited with code %s." % process.returncode
+        )
+
+    raise RemoteControllerExitedError(
+        "Remote controller exited with code %s. Last lines of %s:\n%s"
+        % (process.returncode, stderr_log, read_log_tail(stderr_log))
+    )
 
 
-def wait_until_rc_is_ready() -> None:
-    timeout = 300 + time.time()
-    while time.time() < timeout:
-        with closing(socket.socket()) as sock:
-            if sock.connect_ex(("localhost", 9701)) == 0:
-                return
-            print("Remote controller is not ready yet. Sleeping 1 second.")
-            time.sleep(1)
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by the remote controller.")
+        data += chunk
+    return data
 
-    raise Exception("Remote controller failed to start.")
+
+def _call_rc(method_name: str, host: str, port: int, timeout: float) -> bool:
+    # Calls a remote controller method without arguments, and returns its
+    # boolean result, without depending on the Thrift library
+    seq_id = 1
+    name = method_name.encode()
+    request = struct.pack("!I", THRIFT_VERSION_1 | THRIFT_CALL)
+    request += struct.pack("!i", len(name)) + name + struct.pack("!i", seq_id)
+    request += struct.pack("!b", THRIFT_STOP)
+
+    try:
+        with closing(socket.create_connection((host, port), timeout=timeout)) as sock:
+            sock.sendall(request)
+            (version,) = struct.unpack("!I", _recv_exactly(sock, 4))
+            if version & THRIFT_VERSION_MASK != THRIFT_VERSION_1:
+                return False
+            if version & 0xFF != THRIFT_REPLY:
+                # An exception is not a successful call
+                return False
+
+            (name_length,) = struct.unpack("!i", _recv_exactly(sock, 4))
+            _recv_exactly(sock, name_length + 4)
+            (field_type,) = struct.unpack("!b", _recv_exactly(sock, 1))
+            if field_type != THRIFT_BOOL:
+                return False
+            field_id, success = struct.unpack("!hb", _recv_exactly(sock, 3))
+            return field_id == 0 and success != 0
+    except (OSError, struct.error):
+        return False
+
+
+def ping_rc(host: str = RC_HOST, port: int = RC_PORT, timeout: float = PING_TIMEOUT) -> bool:
+    return _call_rc("ping", host, port, timeout)
+
+
+def exit_rc(host: str = RC_HOST, port: int = RC_PORT, timeout: float = PING_TIMEOUT) -> bool:
+    # The remote controller might exit before replying
+    return _call_rc("exit", host, port, timeout)
+
+
+def _wait_for_log_output(
+    log_path: Optional[str],
+    offset: int,
+    timeout: float,
+    process: Optional[subprocess.Popen],
+    stderr_log: Optional[str],
+) -> Tuple[int, bool]:
+    # Sleeps for the given time, but returns early when the log grows, and
+    # fails as soon as the process exits. Returns the new size of the log
+    # and whether it grew.
+    deadline = time.monotonic() + timeout
+    while True:
+        check_rc_is_alive(process, stderr_log)
+        try:
+            size = os.stat(log_path).st_size if log_path else 0
+        except OSError:
+            size = 0
+
+        if size > offset:
+            return size, True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return offset, False
+        time.sleep(min(READINESS_LOG_POLL_INTERVAL, remaining))
+
+
+def wait_until_rc_is_ready(
+    host: str = RC_HOST,
+    port: int = RC_PORT,
+    timeout: float = RC_STARTUP_TIMEOUT,
+    stdout_log: Optional[str] = RC_STDOUT_LOG,
+    process: Optional[subprocess.Popen] = None,
+    stderr_log: Optional[str] = RC_STDERR_LOG,
+    check: Optional[Callable[[], None]] = None,
+) -> float:
+    # Returns the number of seconds it took the remote controller to answer
+    # a ping after this function is called, right after it is launched.
+    # When its process is given, fails as soon as it exits. The logs are
+    # optional, for processes that do not write into files. The check, if
+    # any, is called before each ping and can abort the wait by raising.
+    started_at = time.monotonic()
+    deadline = started_at + timeout
+    delay = READINESS_INITIAL_DELAY
+    log_offset = 0
+    attempts = 0
+    while True:
+        check_rc_is_alive(process, stderr_log)
+        if check:
+            check()
+        attempts += 1
+        if ping_rc(host, port, min(PING_TIMEOUT, max(deadline - time.monotonic(), 0.1))):
+            startup_latency = time.monotonic() - started_at
+            print(
+                "Remote controller is ready after %.2f seconds and %s pings."
+                % (startup_latency, attempts)
+            )
+            return startup_latency
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        log_offset, has_output = _wait_for_log_output(
+            stdout_log, log_offset, min(delay, remaining), process, stderr_log
+        )
+        if has_output:
+            # It is making progress, so check it again soon
+            delay = READINESS_INITIAL_DELAY
+        else:
+            delay = min(delay * 2, READINESS_MAX_DELAY)
+
+    raise Exception("Remote controller failed to start in %s seconds." % timeout)
+
+
+class CdsArchive:
+    def __init__(self, archive_path: str, startup_without_archive: Optional[float]):
+        self.archive_path = archive_path
+        self.startup_without_archive = startup_without_archive
+
+    def get_jvm_options(self) -> List[str]:
+        return ["-XX:SharedArchiveFile=" + self.archive_path]
+
+    def report_startup(self, startup_with_archive: float) -> None:
+        if self.startup_without_archive is None:
+            print("Remote controller started in %.2f seconds with the AppCDS archive." % startup_with_archive)
+            return
+
+        print(
+            "Remote controller started in %.2f seconds with the AppCDS archive, and in %.2f "
+            "seconds without it." % (startup_with_archive, self.startup_without_archive)
+        )
+
+
+def get_java_version() -> Tuple[str, int]:
+    # Returns the full version output of the JVM, along with its major version
+    p = subprocess.run(
+        ["java", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=IS_ON_WINDOWS
+    )
+    output = (p.stderr or p.stdout).decode(errors="replace").strip()
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', output)
+    if not match:
+        return output, 0
+
+    major_version = int(match.group(1))
+    if major_version == 1 and match.group(2):
+        # Such as 1.8.0_392
+        major_version = int(match.group(2))
+    return output, major_version
+
+
+def get_cds_archive_path(
+    dst_folder: str, class_path: str, java_version: str, jvm_options: List[str]
+) -> str:
+    # Archives are keyed by the JVM, its options and the JARs, so that a new
+    # snapshot build or server version gets its own archive. JARs are only
+    # written when they are downloaded, so their size and modification time
+    # identify them without hashing them on each start.
+    digest = hashlib.sha256(java_version.encode())
+    digest.update(" ".join(jvm_options).encode())
+    for jar in class_path.split(CLASS_PATH_SEPARATOR):
+        stat = os.stat(jar)
+        digest.update(("%s:%s:%s" % (path.basename(jar), stat.st_size, stat.st_mtime_ns)).encode())
+    return path.join(dst_folder, "rc-%s.jsa" % digest.hexdigest()[:32])
+
+
+def get_or_create_cds_archive(
+    dst_folder: str, class_path: str, jvm_options: List[str], rc_args: List[str]
+) -> Optional[CdsArchive]:
+    try:
+        java_version, major_java_version = get_java_version()
+    except OSError as e:
+        # The real launch reports the missing JVM
+        print("Not using an AppCDS archive, as the Java version is unknown (%s)." % e)
+        return None
+
+    if major_java_version < CDS_MIN_JAVA_VERSION:
+        print("Not using an AppCDS archive, as it requires Java %s or newer." % CDS_MIN_JAVA_VERSION)
+        return None
+
+    archive_path = get_cds_archive_path(dst_folder, class_path, java_version, jvm_options)
+    metadata_path = archive_path + ".json"
+    if path.isfile(archive_path):
+        startup_without_archive = None
+        try:
+            with open(metadata_path, "r") as f:
+                startup_without_archive = json.load(f)["startup_without_archive"]
+        except (OSError, ValueError, KeyError):
+            pass
+        print("Using the AppCDS archive " + archive_path)
+        return CdsArchive(archive_path, startup_without_archive)
+
+    print("Creating the AppCDS archive %s with a training run." % archive_path)
+    tmp_archive_path = archive_path + ".tmp"
+    process = launch_rc(rc_args[:1] + ["-XX:ArchiveClassesAtExit=" + tmp_archive_path] + rc_args[1:])
+    try:
+        startup_without_archive = wait_until_rc_is_ready(process=process)
+    except Exception as e:
+        # The real launch reports the error again if it is not specific to
+        # the training run
+        print("The training run failed (%s), launching without an AppCDS archive." % e)
+        startup_without_archive = None
+    finally:
+        # The archive is written when the JVM exits
+        exit_rc()
+        try:
+            process.wait(CDS_TRAINING_EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            process.wait()
+
+    if startup_without_archive is None:
+        if path.exists(tmp_archive_path):
+            os.remove(tmp_archive_path)
+        return None
+
+    if not path.isfile(tmp_archive_path):
+        print("The training run did not create the AppCDS archive, launching without it.")
+        return None
+
+    os.replace(tmp_archive_path, archive_path)
+    with open(metadata_path, "w") as f:
+        json.dump({"java_version": java_version, "startup_without_archive": startup_without_archive}, f)
+    remove_stale_cds_archives(dst_folder, archive_path)
+    return CdsArchive(archive_path, startup_without_archive)
+
+
+def remove_stale_cds_archives(dst_folder: str, archive_path: str) -> None:
+    # Archives of the previous JARs or JVMs are never used again
+    keep = {path.basename(archive_path), path.basename(archive_path) + ".json"}
+    for name in os.listdir(dst_folder):
+        if name in keep or not name.startswith("rc-"):
+            continue
+        if not (name.endswith(".jsa") or name.endswith(".jsa.json")):
+            continue
+        try:
+            os.remove(path.join(dst_folder, name))
+        except OSError:
+            # Such as an archive mapped by a running JVM on Windows
+            pass
+
+
+def get_peak_rss(pid: int) -> Optional[int]:
+    # Returns the peak resident set size of the process in bytes, which is
+    # only known on Linux
+    try:
+        with open("/proc/%s/status" % pid, "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _parse_gc_time(header: List[str], values: List[str]) -> Optional[float]:
+    try:
+        return float(values[header.index("GCT")])
+    except (ValueError, IndexError):
+        return None
+
+
+def get_gc_time(pid: int) -> Optional[float]:
+    # Returns the total time the JVM spent in garbage collection in seconds,
+    # when jstat is available
+    if not shutil.which("jstat"):
+        return None
+
+    try:
+        p = subprocess.run(
+            ["jstat", "-gcutil", str(pid)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=10,
+            shell=IS_ON_WINDOWS,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    lines = p.stdout.decode(errors="replace").split()
+    if p.returncode != 0 or "GCT" not in lines:
+        return None
+
+    # The output is a header line followed by a line of values
+    columns = len(lines) // 2
+    return _parse_gc_time(lines[:columns], lines[columns:])
+
+
+class GcTimeMonitor:
+    # Follows the GC time of a JVM until it exits with a single jstat
+    # process that prints it at the given interval, as each jstat call
+    # starts a JVM of its own
+    def __init__(self, pid: int, interval: float):
+        self.gc_time: Optional[float] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        if not shutil.which("jstat"):
+            return
+
+        try:
+            self._process = subprocess.Popen(
+                ["jstat", "-gcutil", str(pid), "%dms" % (interval * 1000)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                shell=IS_ON_WINDOWS,
+            )
+        except OSError:
+            return
+
+        self._thread = threading.Thread(target=self._read_output, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        # jstat exits on its own once the JVM exits
+        if self._process is None:
+            return
+
+        try:
+            self._process.wait(GC_TIME_MONITOR_EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.terminate()
+            self._process.wait()
+        if self._thread:
+            self._thread.join()
+
+    def _read_output(self) -> None:
+        header = None
+        for line in self._process.stdout:
+            fields = line.decode(errors="replace").split()
+            if "GCT" in fields:
+                header = fields
+            elif header:
+                gc_time = _parse_gc_time(header, fields)
+                if gc_time is not None:
+                    self.gc_time = gc_time
+
+
+class LaunchReport:
+    # Startup and footprint telemetry of a remote controller launch, used to
+    # compare the launch profiles on each runner type
+    def __init__(self, profile: str, jvm_options: List[str]):
+        self.profile = profile
+        self.jvm_options = jvm_options
+        self.time_to_ready: Optional[float] = None
+        self.peak_rss: Optional[int] = None
+        self.gc_time: Optional[float] = None
+        self.extra: Dict[str, object] = {}
+
+    def sample(self, pid: int) -> None:
+        self.sample_peak_rss(pid)
+        gc_time = get_gc_time(pid)
+        if gc_time is not None:
+            self.gc_time = gc_time
+
+    def sample_peak_rss(self, pid: int) -> None:
+        peak_rss = get_peak_rss(pid)
+        if peak_rss is not None:
+            self.peak_rss = max(peak_rss, self.peak_rss or 0)
+
+    def to_json(self) -> Dict:
+        data = {
+            "profile": self.profile,
+            "jvm_options": self.jvm_options,
+            "time_to_ready": self.time_to_ready,
+            "peak_rss_bytes": self.peak_rss,
+            "gc_time_seconds": self.gc_time,
+            "runner": {
+                "name": os.environ.get("RUNNER_NAME"),
+                "os": platform.system(),
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+            },
+        }
+        data.update(self.extra)
+        return data
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+            f.write("\n")
 
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.mirror:
+        set_mirror(args.mirror)
     rc_version = args.rc_version
     jars = args.jars
     server_kind = ServerKind[args.server_kind.upper()]
     use_simple_server = args.use_simple_server
-    start_rc(rc_version, jars, use_simple_server, server_kind)
-    wait_until_rc_is_ready()
+    try:
+        rc_process, cds_archive = start_rc(
+            rc_version, jars, use_simple_server, server_kind, args.lockfile, args.cds, args.profile
+        )
+        startup_latency = wait_until_rc_is_ready(process=rc_process)
+    except RemoteControllerExitedError as e:
+        print(e)
+        sys.exit(1)
+
+    if cds_archive:
+        cds_archive.report_startup(startup_latency)
+
+    # The process keeps running after this script exits, so the footprint
+    # is the one at the time it became ready
+    jvm_options = list(JVM_LAUNCH_PROFILES[args.profile])
+    if cds_archive:
+        jvm_options += cds_archive.get_jvm_options()
+    launch_report = LaunchReport(args.profile, jvm_options)
+    launch_report.time_to_ready = startup_latency
+    launch_report.sample(rc_process.pid)
+    if cds_archive:
+        launch_report.extra["cds_archive"] = cds_archive.archive_path
+        launch_report.extra["time_to_ready_without_cds_archive"] = cds_archive.startup_without_archive
+    launch_report.save(args.report)
+    print("Wrote the launch report to " + args.report)
@@ -2,16 +2,31 @@ import argparse
 import os
 import subprocess
 import sys
-from os.path import isfile
+
+from start_rc import (
+    DEFAULT_JVM_LAUNCH_PROFILE,
+    GcTimeMonitor,
+    JVM_LAUNCH_PROFILES,
+    LaunchReport,
+    RC_LAUNCH_REPORT,
+    RemoteControllerExitedError,
+    wait_until_rc_is_ready,
+)
+from util import (
+    ArtifactRequest,
+    CLASS_PATH_SEPARATOR,
+    DownloadFailedError,
+    ENTERPRISE_RELEASE_REPO,
+    ENTERPRISE_SNAPSHOT_REPO,
+    IS_ON_WINDOWS,
+    RELEASE_REPO,
+    SNAPSHOT_REPO,
+    download_artifacts,
+)
 
 SERVER_VERSION = "5.0"
 RC_VERSION = "0.8-SNAPSHOT"
 
-RELEASE_REPO = "https://repo.maven.apache.org/maven2"
-ENTERPRISE_RELEASE_REPO = "https://repository.hazelcast.com/release/"
-SNAPSHOT_REPO = "https://oss.sonatype.org/content/repositories/snapshots"
-ENTERPRISE_SNAPSHOT_REPO = "https://repository.hazelcast.com/snapshot/"
-
 if SERVER_VERSION.endswith("-SNAPSHOT"):
     REPO = SNAPSHOT_REPO
     ENTERPRISE_REPO = ENTERPRISE_SNAPSHOT_REPO
@@ -19,13 +34,8 @@ else:
     REPO = RELEASE_REPO
     ENTERPRISE_REPO = ENTERPRISE_RELEASE_REPO
 
-if RC_VERSION.endswith("-SNAPSHOT"):
-    RC_REPO = SNAPSHOT_REPO
-else:
-    RC_REPO = RELEASE_REPO
-
-IS_ON_WINDOWS = os.name == "nt"
-CLASS_PATH_SEPARATOR = ";" if IS_ON_WINDOWS else ":"
+# Seconds between the samples of the footprint of the remote controller
+REPORT_SAMPLE_INTERVAL = 5
 
 
 def parse_args() -> argparse.Namespace:
@@ -40,70 +50,57 @@ def parse_args() -> argparse.Namespace:
         help="Use the RC in simple server mode",
     )
 
-    return parser.parse_args()
-
-
-def download_if_necessary(repo, artifact_id, version, is_test_artifact=False):
-    dest_file_name = artifact_id + "-" + version
-    if is_test_artifact:
-        dest_file_name += "-tests"
-    dest_file_name += ".jar"
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store",
+        type=str,
+        default=DEFAULT_JVM_LAUNCH_PROFILE,
+        choices=list(JVM_LAUNCH_PROFILES),
+        required=False,
+        help="JVM launch profile of the remote controller",
+    )
 
-    if isfile(dest_file_name):
-        print("Not downloading %s, because it already exists." % dest_file_name)
-        return dest_file_name
+    parser.add_argument(
+        "--report",
+        dest="report",
+        action="store",
+        type=str,
+        default=RC_LAUNCH_REPORT,
+        required=False,
+        help="JSON file to write the time to ready, peak RSS and GC time of the launch into",
+    )
 
-    print("Downloading " + dest_file_name)
+    return parser.parse_args()
 
-    artifact = "com.hazelcast:" + artifact_id + ":" + version
-    if is_test_artifact:
-        artifact += ":jar:tests"
 
-    args = [
-        "mvn",
-        "-q",
-        "org.apache.maven.plugins:maven-dependency-plugin:2.10:get",
-        "-Dtransitive=false",
-        "-DremoteRepositories=" + repo,
-        "-Dartifact=" + artifact,
-        "-Ddest=" + dest_file_name,
+def start_rc(
+    use_simple_server: bool, stdout=None, stderr=None, profile: str = DEFAULT_JVM_LAUNCH_PROFILE
+):
+    requests = [
+        ArtifactRequest(ENTERPRISE_SNAPSHOT_REPO, "hazelcast-remote-controller", RC_VERSION),
+        ArtifactRequest(REPO, "hazelcast", SERVER_VERSION, is_test_artifact=True),
+        ArtifactRequest(REPO, "hazelcast-sql", SERVER_VERSION),
     ]
 
-    process = subprocess.run(args, shell=IS_ON_WINDOWS)
-    if process.returncode != 0:
-        print("Failed to download " + dest_file_name)
-        sys.exit(1)
-
-    return dest_file_name
-
-
-def start_rc(use_simple_server: bool, stdout=None, stderr=None):
-    artifacts = []
-
-    rc = download_if_necessary(ENTERPRISE_SNAPSHOT_REPO, "hazelcast-remote-controller", RC_VERSION)
-    tests = download_if_necessary(REPO, "hazelcast", SERVER_VERSION, True)
-    sql = download_if_necessary(REPO, "hazelcast-sql", SERVER_VERSION)
-
-    artifacts.extend([rc, tests, sql])
-
     enterprise_key = os.environ.get("HAZELCAST_ENTERPRISE_KEY", None)
 
     if enterprise_key:
-        server = download_if_necessary(ENTERPRISE_REPO, "hazelcast-enterprise", SERVER_VERSION)
-        ep_tests = download_if_necessary(
-            ENTERPRISE_REPO, "hazelcast-enterprise", SERVER_VERSION, True
+        requests.append(ArtifactRequest(ENTERPRISE_REPO, "hazelcast-enterprise", SERVER_VERSION))
+        requests.append(
+            ArtifactRequest(ENTERPRISE_REPO, "hazelcast-enterprise", SERVER_VERSION, is_test_artifact=True)
         )
-
-        artifacts.append(server)
-        artifacts.append(ep_tests)
     else:
-        server = download_if_necessary(REPO, "hazelcast", SERVER_VERSION)
-        artifacts.append(server)
+        requests.append(ArtifactRequest(REPO, "hazelcast", SERVER_VERSION))
+
+    try:
+        artifacts = download_artifacts(requests, ".")
+    except DownloadFailedError:
+        sys.exit(1)
 
     class_path = CLASS_PATH_SEPARATOR.join(artifacts)
 
-    args = [
-        "java",
+    args = ["java"] + JVM_LAUNCH_PROFILES[profile] + [
         "-cp",
         class_path,
         "com.hazelcast.remotecontroller.Main",
@@ -119,9 +116,38 @@ def start_rc(use_simple_server: bool, stdout=None, stderr=None):
 
 if __name__ == "__main__":
     args = parse_args()
-    rc_process = start_rc(args.use_simple_server)
+    rc_process = start_rc(args.use_simple_server, profile=args.profile)
+    launch_report = LaunchReport(args.profile, JVM_LAUNCH_PROFILES[args.profile])
     try:
-        rc_process.wait()
+        try:
+            launch_report.time_to_ready = wait_until_rc_is_ready(
+                stdout_log=None, process=rc_process, stderr_log=None
+            )
+        except RemoteControllerExitedError as e:
+            print(e)
+            sys.exit(1)
+
+        launch_report.sample(rc_process.pid)
+        launch_report.save(args.report)
+
+        # The footprint is followed until the remote controller exits, as it
+        # is no longer readable afterwards. The peak RSS is a cheap read, and
+        # the GC time comes from a single jstat process.
+        gc_time_monitor = GcTimeMonitor(rc_process.pid, REPORT_SAMPLE_INTERVAL)
+        try:
+            while True:
+                launch_report.sample_peak_rss(rc_process.pid)
+                try:
+                    rc_process.wait(REPORT_SAMPLE_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+        finally:
+            gc_time_monitor.stop()
+
+        if gc_time_monitor.gc_time is not None:
+            launch_report.gc_time = gc_time_monitor.gc_time
+        launch_report.save(args.report)
     except:
         rc_process.kill()
         rc_process.wait()
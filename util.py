@@ -1,16 +1,35 @@
-import itertools
+import bisect
+import contextlib
+import functools
+import hashlib
+import http.client
+import heapq
+import io
+import json
 import os
+import pathlib
+import pickle
 import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
 
 import subprocess
+import urllib.error
 import urllib.request
+import xml.etree.ElementTree as ElementTree
 
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from os import path
-from typing import List, Dict, Callable, Tuple, Optional, DefaultDict, Tuple
-from urllib.parse import urlparse
+from typing import List, Dict, Callable, Tuple, Optional, DefaultDict, FrozenSet, Iterable, Iterator, Set
+from urllib.parse import urlparse, urljoin
+
+import http_client
 
 # Slightly modified version of
 # https://semver.org/#is-there-a-suggested-regular-expression-regex-to-check-a-semver-string
@@ -46,24 +65,95 @@ IMDG_CLIENTS = (
 )
 HAZELCAST_SERVERS = "https://raw.githubusercontent.com/hazelcast/rel-scripts/master/hazelcast-enterprise.txt"
 
-CLIENT_HEADER = "======= %s Client\n---\n(.*?)\n---\n==="
+# Release feeds are a sequence of sections, each starting with a header
+# line such as "========== Current Stable" or "======= Python Client",
+# that contain release blocks separated by "---" lines.
+SECTION_HEADER_PREFIX = "==="
+BLOCK_SEPARATOR = "---"
+CURRENT_STABLE_SECTION = "Current Stable"
+PREVIOUS_STABLE_SECTION = "Previous Stable"
+CLIENT_SECTION_SUFFIX = " Client"
 
 RELEASE_REPO = "https://repo.maven.apache.org/maven2"
 ENTERPRISE_RELEASE_REPO = "https://repository.hazelcast.com/release/"
 SNAPSHOT_REPO = "https://oss.sonatype.org/content/repositories/snapshots"
 ENTERPRISE_SNAPSHOT_REPO = "https://repository.hazelcast.com/snapshot/"
 
+# When a mirror is set, every release feed and Maven repository URL is
+# resolved against it as <mirror>/<host>/<path>, which is the layout
+# produced by "wget --mirror". The mirror can be a local directory, or a
+# file:// or http(s):// URL.
+MIRROR = os.environ.get("HZ_MIRROR", "")
+
+MAVEN_GROUP_ID = "com.hazelcast"
+TEST_ARTIFACT_CLASSIFIER = "tests"
+SNAPSHOT_SUFFIX = "-SNAPSHOT"
+
+# Artifacts are downloaded by building the repository layout URLs in
+# Python. Set this to "mvn" to use the Maven dependency plugin instead.
+MAVEN_RESOLVER = os.environ.get("HZ_MAVEN_RESOLVER", "native")
+ARTIFACT_DOWNLOAD_TIMEOUT = float(os.environ.get("HZ_ARTIFACT_DOWNLOAD_TIMEOUT", "60"))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Interrupted downloads are resumed from their partial files with range
+# requests, waiting exponentially longer between the attempts.
+ARTIFACT_DOWNLOAD_RETRIES = int(os.environ.get("HZ_ARTIFACT_DOWNLOAD_RETRIES", "4"))
+ARTIFACT_DOWNLOAD_BACKOFF = float(os.environ.get("HZ_ARTIFACT_DOWNLOAD_BACKOFF", "1"))
+ARTIFACT_DOWNLOAD_MAX_BACKOFF = 30
+PARTIAL_DOWNLOAD_SUFFIX = ".part"
+# The timestamped build of a downloaded snapshot artifact is recorded in a
+# file next to it, so that it is downloaded again only when a new build is
+# published.
+SNAPSHOT_BUILD_SUFFIX = ".build"
+ARTIFACT_DOWNLOAD_MAX_WORKERS = int(os.environ.get("HZ_ARTIFACT_DOWNLOAD_WORKERS", "4"))
+
+# Downloaded artifacts are stored in a content-addressed cache shared by
+# all the jobs on the same machine, and linked into the destination
+# folders. Set HZ_ARTIFACT_CACHE_DIR to an empty string to disable it.
+ARTIFACT_CACHE_DIR = os.environ.get(
+    "HZ_ARTIFACT_CACHE_DIR",
+    path.join(path.expanduser("~"), ".cache", "hazelcast-compatibility", "artifacts"),
+)
+
+# Optional artifacts found to be missing, such as hazelcast-sql for 4.0.x,
+# are recorded under the artifact cache and not requested again for this many
+# seconds. Set it to 0 to disable the negative cache.
+MISSING_ARTIFACT_TTL = float(os.environ.get("HZ_MISSING_ARTIFACT_TTL", str(24 * 60 * 60)))
+
+# When set, the least recently used artifacts are evicted from the cache
+# after each new download to keep it under this many bytes. Artifacts of
+# the pinned server versions, given as a comma separated list or a JSON
+# array such as the output of get_server_matrix.py, are never evicted.
+# Sizes can have a K, M or G suffix.
+ARTIFACT_CACHE_MAX_BYTES = os.environ.get("HZ_ARTIFACT_CACHE_MAX_BYTES", "")
+ARTIFACT_CACHE_PINNED_VERSIONS = os.environ.get("HZ_ARTIFACT_CACHE_PINNED_VERSIONS", "")
+
+# Temporary files are created with 0600, downloaded files should get the
+# usual permissions instead.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+DOWNLOADED_FILE_MODE = 0o666 & ~_UMASK
+
 IS_ON_WINDOWS = os.name == "nt"
 CLASS_PATH_SEPARATOR = ";" if IS_ON_WINDOWS else ":"
 
-CURRENT_STABLE_SERVER_PATTERN = re.compile(
-    "========== Current Stable\n---\n(.*?)---", re.DOTALL
+# Release feeds are cached on disk so that repeated matrix generations
+# within the TTL do not hit the network at all, and the ones after it
+# only pay for a conditional request. Set HZ_FEED_CACHE_DIR to an empty
+# string to disable the cache.
+FEED_CACHE_DIR = os.environ.get(
+    "HZ_FEED_CACHE_DIR",
+    path.join(path.expanduser("~"), ".cache", "hazelcast-compatibility", "feeds"),
 )
-PREVIOUS_STABLE_SERVER_PATTERN = re.compile(
-    "========== Previous Stable\n---\n(.*?)---\n========== Development:",
-    re.DOTALL,
-) 
+FEED_CACHE_TTL = float(os.environ.get("HZ_FEED_CACHE_TTL", "300"))
+
+# Upper bound, in seconds, for fetching all the release feeds, which are
+# fetched concurrently
+FEED_FETCH_TIMEOUT = float(os.environ.get("HZ_FEED_FETCH_TIMEOUT", "30"))
+FEED_FETCH_MAX_WORKERS = 8
 
+# Bump this whenever the pickled Release model changes shape, or the
+# parsers start returning different releases for the same feed.
+RELEASE_CACHE_FORMAT = 3
 
 class ClientKind(Enum):
     CS = ".NET/CSharp"
@@ -78,20 +168,108 @@ class ServerKind(Enum):
     ENTERPRISE = 1
 
 
+def _pre_release_key(pre_release: Optional[str]) -> Tuple:
+    # Versions without a pre-release have a higher precedence than the
+    # ones with it. Otherwise, identifiers are compared one by one, with
+    # numeric ones compared numerically and always lower than the others.
+    if not pre_release:
+        return (1,)
+
+    identifiers = []
+    for identifier in pre_release.split("."):
+        if identifier.isdigit():
+            identifiers.append((0, int(identifier), ""))
+        else:
+            identifiers.append((1, 0, identifier))
+
+    return 0, tuple(identifiers)
+
+
+_VERSION_CACHE: Dict[str, "Version"] = {}
+
+
 class Version:
-    def __init__(self, version: str):
-        self.version_str = version
+    # Versions are immutable and interned, so that a version string is
+    # parsed only once. They are ordered, and equal, according to the
+    # semver precedence rules, which ignore the build metadata.
+    __slots__ = (
+        "version_str",
+        "major",
+        "minor",
+        "patch",
+        "pre_release",
+        "build_metadata",
+        "stable",
+        "_key",
+        "_hash",
+    )
+
+    def __new__(cls, version: str) -> "Version":
+        cached = _VERSION_CACHE.get(version)
+        if cached is not None:
+            return cached
+
         m = re.match(VERSION_PATTERN, version)
         if not m:
             raise ValueError("Cannot parse %s version" % version)
 
         parts = m.groupdict()
-        self.major = int(parts["major"])
-        self.minor = int(parts["minor"])
-        self.patch = int(parts["patch"] or 0)
-        self.pre_release = parts["prerelease"]
-        self.build_metadata = parts["buildmetadata"]
-        self.stable = not self.pre_release and not self.build_metadata
+        self = super(Version, cls).__new__(cls)
+        set_attr = super(Version, self).__setattr__
+        set_attr("version_str", version)
+        set_attr("major", int(parts["major"]))
+        set_attr("minor", int(parts["minor"]))
+        set_attr("patch", int(parts["patch"] or 0))
+        set_attr("pre_release", parts["prerelease"])
+        set_attr("build_metadata", parts["buildmetadata"])
+        set_attr("stable", not self.pre_release and not self.build_metadata)
+        set_attr("_key", (self.major, self.minor, self.patch, _pre_release_key(self.pre_release)))
+        set_attr("_hash", hash(self._key))
+
+        _VERSION_CACHE[version] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Version objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Version objects are immutable")
+
+    def __reduce__(self):
+        return Version, (self.version_str,)
+
+    def __eq__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key == other._key
+
+    def __ne__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key != other._key
+
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key < other._key
+
+    def __le__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key <= other._key
+
+    def __gt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key > other._key
+
+    def __ge__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key >= other._key
+
+    def __hash__(self) -> int:
+        return self._hash
 
     def __repr__(self) -> str:
         return "Version(major=%s, minor=%s, patch=%s, pre_release=%s, build_metadata=%s, stable=%s)" % (
@@ -105,18 +283,77 @@ class Version:
 
 
 class Release:
+    # Releases are immutable, and ordered by their versions first.
+    __slots__ = ("version", "tag", "_hash")
+
     def __init__(self, version: str, tag: str):
-        self.version = Version(version)
-        self.tag = tag
+        set_attr = super(Release, self).__setattr__
+        set_attr("version", Version(version))
+        set_attr("tag", tag)
+        set_attr("_hash", hash(self._sort_key()))
+
+    def _sort_key(self) -> Tuple:
+        return self.version, self.tag
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Release objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Release objects are immutable")
+
+    def __reduce__(self):
+        return Release, (self.version.version_str, self.tag)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._sort_key() == other._sort_key()
+
+    def __ne__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._sort_key() != other._sort_key()
+
+    def __lt__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._sort_key() < other._sort_key()
+
+    def __le__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._sort_key() <= other._sort_key()
+
+    def __gt__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._sort_key() > other._sort_key()
+
+    def __ge__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._sort_key() >= other._sort_key()
+
+    def __hash__(self) -> int:
+        return self._hash
 
     def __repr__(self) -> str:
         return "Release(version=%s, tag=%s)" % (self.version, self.tag)
 
 
 class ClientRelease(Release):
+    __slots__ = ("kind",)
+
     def __init__(self, kind: ClientKind, version: str, tag: str):
+        # The kind must be set first, as it is a part of the hash
+        object.__setattr__(self, "kind", kind)
         super(ClientRelease, self).__init__(version, tag)
-        self.kind = kind
+
+    def _sort_key(self) -> Tuple:
+        return self.version, self.kind.name, self.tag
+
+    def __reduce__(self):
+        return ClientRelease, (self.kind, self.version.version_str, self.tag)
 
     def __repr__(self) -> str:
         return "ClientRelease(kind=%s, version=%s, tag=%s)" % (
@@ -131,6 +368,9 @@ class ReleaseFilter(ABC):
     def filter(self, release: Release) -> bool:
         pass
 
+    def filter_many(self, releases: Iterable[Release]) -> List[Release]:
+        return [release for release in releases if self.filter(release)]
+
 
 class MajorVersionFilter(ReleaseFilter):
     def __init__(self, major_versions: List[int]):
@@ -140,7 +380,7 @@ class MajorVersionFilter(ReleaseFilter):
         return release.version.major in self._versions
 
     def __repr__(self) -> str:
-        return "MajorVersionFilter(versions=%s)" % self._versions
+        return "MajorVersionFilter(versions=%s)" % sorted(self._versions)
 
 class MajorMinorVersionFilter(ReleaseFilter):
     def __init__(self, min_major_minor_version: Tuple[int, int]):
@@ -151,7 +391,7 @@ class MajorMinorVersionFilter(ReleaseFilter):
         return (v.major, v.minor) >= self._min_version
 
     def __repr__(self) -> str:
-        return "MajorVersionFilter(versions=%s)" % self._versions
+        return "MajorMinorVersionFilter(min_version=%s)" % (self._min_version,)
 
 class StableReleaseFilter(ReleaseFilter):
     def filter(self, release: Release) -> bool:
@@ -163,58 +403,373 @@ class StableReleaseFilter(ReleaseFilter):
 class SupportedReleaseFilter(ReleaseFilter):
     def __init__(self, unsupported_versions: List[Version]):
         self._unsupported_versions = unsupported_versions
+        self._unsupported_minors = frozenset((v.major, v.minor) for v in unsupported_versions)
 
     def filter(self, release: Release) -> bool:
-        for version in self._unsupported_versions:
-            if release.version.major == version.major and \
-               release.version.minor == version.minor:
-                return False
-        return True
+        v = release.version
+        return (v.major, v.minor) not in self._unsupported_minors
 
     def __repr__(self) -> str:
         return "SupportedReleaseFilter(unsupported_versions=%s)" % self._unsupported_versions
 
-class AbstractReleaseParser(ABC):
+
+class FilterPipeline(ReleaseFilter):
+    # Compiles a chain of filters into a single predicate. The built-in
+    # filters are merged into set lookups and comparisons on the version
+    # fields, so that the cost per release does not grow with the number
+    # of filters or the size of their version lists. Other filters are
+    # called as they are.
     def __init__(self, filters: List[ReleaseFilter]):
         self._filters = filters
+        self._predicate = self._compile(filters)
+
+    def filter(self, release: Release) -> bool:
+        return self._predicate(release)
+
+    def filter_many(self, releases: Iterable[Release]) -> List[Release]:
+        predicate = self._predicate
+        return [release for release in releases if predicate(release)]
+
+    def __repr__(self) -> str:
+        return "FilterPipeline(filters=%s)" % self._filters
+
+    @staticmethod
+    def _compile(filters: List[ReleaseFilter]) -> Callable[[Release], bool]:
+        majors: Optional[FrozenSet[int]] = None
+        min_minor: Optional[Tuple[int, int]] = None
+        stable_only = False
+        unsupported_minors: Set[Tuple[int, int]] = set()
+        other_predicates: List[Callable[[Release], bool]] = []
+
+        pending = list(filters)
+        while pending:
+            f = pending.pop(0)
+            if type(f) is FilterPipeline:
+                pending[0:0] = f._filters
+            elif type(f) is MajorVersionFilter:
+                majors = f._versions if majors is None else majors & f._versions
+            elif type(f) is MajorMinorVersionFilter:
+                min_minor = f._min_version if min_minor is None else max(min_minor, f._min_version)
+            elif type(f) is StableReleaseFilter:
+                stable_only = True
+            elif type(f) is SupportedReleaseFilter:
+                unsupported_minors.update(f._unsupported_minors)
+            else:
+                other_predicates.append(f.filter)
+
+        unsupported = frozenset(unsupported_minors)
+
+        def predicate(release: Release) -> bool:
+            v = release.version
+            if majors is not None and v.major not in majors:
+                return False
+            if stable_only and not v.stable:
+                return False
+            if min_minor is not None or unsupported:
+                minor = (v.major, v.minor)
+                if min_minor is not None and minor < min_minor:
+                    return False
+                if minor in unsupported:
+                    return False
+            for other_predicate in other_predicates:
+                if not other_predicate(release):
+                    return False
+            return True
+
+        return predicate
+
+
+def set_mirror(mirror: str) -> None:
+    global MIRROR
+    MIRROR = mirror
+
+
+def get_mirrored_url(url: str) -> str:
+    if not MIRROR:
+        return url
+
+    mirror = MIRROR
+    if not urlparse(mirror).scheme or (IS_ON_WINDOWS and path.isabs(mirror)):
+        mirror = pathlib.Path(path.abspath(mirror)).as_uri()
+
+    if not mirror.endswith("/"):
+        mirror += "/"
+
+    pr = urlparse(url)
+    return urljoin(mirror, pr.netloc + pr.path)
+
+
+def is_local_url(url: str) -> bool:
+    return urlparse(url).scheme == "file"
+
+
+def _write_atomically(file_path: str, data: bytes) -> None:
+    directory = path.dirname(path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FeedCache:
+    def __init__(self, cache_dir: str, ttl: float):
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+
+    def fetch(
+        self, url: str, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> str:
+        # Nothing is written into the cache once the deadline, if any, has
+        # passed, as the caller gave up on the result
+        key = hashlib.sha256(url.encode()).hexdigest()
+        metadata_path = path.join(self._cache_dir, key + ".json")
+        body_path = path.join(self._cache_dir, key + ".txt")
+
+        metadata = self._read_metadata(metadata_path, body_path)
+        if metadata and time.time() - metadata["fetched_at"] < self._ttl:
+            return self._read_body(body_path)
+
+        headers = {}
+        if metadata:
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified"):
+                headers["If-Modified-Since"] = metadata["last_modified"]
+
+        try:
+            with http_client.urlopen(url, headers, timeout=timeout, accept_gzip=True) as r:
+                raw_data = r.read()
+                etag = r.headers.get("ETag")
+                last_modified = r.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not metadata:
+                raise
+
+            check_deadline(url, deadline)
+
+            metadata["fetched_at"] = time.time()
+            _write_atomically(metadata_path, json.dumps(metadata).encode())
+            return self._read_body(body_path)
+
+        check_deadline(url, deadline)
+        _write_atomically(body_path, raw_data)
+        metadata = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        _write_atomically(metadata_path, json.dumps(metadata).encode())
+        return raw_data.decode()
+
+    def load_releases(self, raw_data: str, parser_key: str) -> Optional[List["Release"]]:
+        releases_path = self._releases_path(raw_data, parser_key)
+        try:
+            with open(releases_path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A corrupt or outdated entry is just a cache miss
+            return None
+
+    def store_releases(self, raw_data: str, parser_key: str, releases: List["Release"]) -> None:
+        releases_path = self._releases_path(raw_data, parser_key)
+        _write_atomically(releases_path, pickle.dumps(releases))
+
+    def _releases_path(self, raw_data: str, parser_key: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(raw_data.encode())
+        digest.update(b"\0")
+        digest.update(("%s:%s" % (RELEASE_CACHE_FORMAT, parser_key)).encode())
+        return path.join(self._cache_dir, "releases-" + digest.hexdigest() + ".pickle")
+
+    @staticmethod
+    def _read_metadata(metadata_path: str, body_path: str) -> Optional[Dict]:
+        if not path.isfile(body_path):
+            return None
+
+        try:
+            with open(metadata_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _read_body(body_path: str) -> str:
+        with open(body_path, "rb") as f:
+            return f.read().decode()
+
+
+def get_default_feed_cache() -> Optional[FeedCache]:
+    if not FEED_CACHE_DIR:
+        return None
+
+    return FeedCache(FEED_CACHE_DIR, FEED_CACHE_TTL)
+
+
+def check_deadline(url: str, deadline: Optional[float]) -> None:
+    if deadline is not None and time.monotonic() >= deadline:
+        raise TimeoutError("Fetching %s did not complete in time" % url)
+
+
+def fetch_feed(
+    url: str,
+    feed_cache: Optional[FeedCache],
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+) -> str:
+    if feed_cache and not is_local_url(url):
+        return feed_cache.fetch(url, timeout, deadline)
+
+    with http_client.urlopen(url, timeout=timeout, accept_gzip=True) as r:
+        return r.read().decode()
+
+
+# Results are returned in the order of the given URLs. The timeout is a
+# deadline for fetching all of them, not only a socket timeout, so a mirror
+# that trickles the data in cannot hold up the matrix generation. A feed
+# that could not be fetched in time fails the whole fetch.
+def fetch_feeds(
+    urls: List[str],
+    feed_cache: Optional[FeedCache],
+    timeout: Optional[float] = FEED_FETCH_TIMEOUT,
+    max_workers: int = FEED_FETCH_MAX_WORKERS,
+) -> List[str]:
+    results: List[Optional[str]] = [None] * len(urls)
+    errors: List[Optional[BaseException]] = [None] * len(urls)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    workers = threading.BoundedSemaphore(max(1, max_workers))
+
+    def fetch(index: int, url: str) -> None:
+        # Fetches that are still queued at the deadline do not start
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not workers.acquire(timeout=remaining):
+            return
+
+        try:
+            results[index] = fetch_feed(url, feed_cache, timeout, deadline)
+        except Exception as e:
+            errors[index] = e
+        finally:
+            workers.release()
+
+    # Daemon threads are used instead of an executor, whose workers would
+    # be waited for on shutdown and on exit. At most max_workers of them
+    # fetch at the same time.
+    threads = [
+        threading.Thread(target=fetch, args=(index, url), daemon=True)
+        for index, url in enumerate(urls)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    failures = []
+    for index, (url, thread) in enumerate(zip(urls, threads)):
+        if thread.is_alive():
+            error: Optional[BaseException] = TimeoutError(
+                "Fetching %s did not complete within %s seconds" % (url, timeout)
+            )
+        else:
+            error = errors[index]
+
+        if error:
+            print("Failed to fetch %s: %s" % (url, error), file=sys.stderr)
+            failures.append(error)
+
+    if failures:
+        raise failures[0]
+
+    return [result for result in results if result is not None]
+
+
+def apply_filters(filters: List[ReleaseFilter], releases: List[Release]) -> List[Release]:
+    return FilterPipeline(filters).filter_many(releases)
+
+
+def iter_release_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, List[str]]]:
+    section = None
+    block: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        is_header = line.startswith(SECTION_HEADER_PREFIX)
+        if is_header or line == BLOCK_SEPARATOR:
+            if section is not None and block:
+                yield section, block
+
+            block = []
+            if is_header:
+                section = line.strip("= ")
+        elif line:
+            block.append(line)
+
+    if section is not None and block:
+        yield section, block
+
+
+class AbstractReleaseParser(ABC):
+    def __init__(self, filters: List[ReleaseFilter], feed_cache: Optional[FeedCache] = None):
+        self._filters = filters
+        self._feed_cache = feed_cache or get_default_feed_cache()
 
     def get_all_releases(self) -> List[Release]:
         all_releases = []
 
-        for source_url in self.get_source_urls():
-            with urllib.request.urlopen(source_url) as r:
-                raw_data = r.read().decode()
+        source_urls = [get_mirrored_url(url) for url in self.get_source_urls()]
+        for raw_data in fetch_feeds(source_urls, self._feed_cache):
+            all_releases.extend(self._parse_with_cache(raw_data))
 
-            releases = self.parse_raw_data(raw_data)
-            all_releases.extend(releases)
-
-        filtered_releases = []
-        for release in all_releases:
-            should_add = True
-            for filter in self._filters:
-                if not filter.filter(release):
-                    should_add = False
-                    break
+        return apply_filters(self._filters, all_releases)
 
-            if should_add:
-                filtered_releases.append(release)
+    def get_cache_key(self) -> str:
+        return type(self).__name__
 
-        return filtered_releases
+    def _parse_with_cache(self, raw_data: str) -> List[Release]:
+        if not self._feed_cache:
+            return self.parse_raw_data(raw_data)
+
+        cache_key = self.get_cache_key()
+        releases = self._feed_cache.load_releases(raw_data, cache_key)
+        if releases is None:
+            releases = self.parse_raw_data(raw_data)
+            self._feed_cache.store_releases(raw_data, cache_key, releases)
+
+        return releases
 
     @abstractmethod
     def get_source_urls(self) -> List[str]:
         pass
 
+    # Lazily yields the releases read from the given feed lines, before
+    # they are filtered. Feeds are not guaranteed to be sorted, so every
+    # release of the relevant sections is read.
     @abstractmethod
-    def parse_raw_data(self, raw_data: str) -> List[Release]:
+    def iter_releases(self, lines: Iterable[str]) -> Iterator[Release]:
         pass
 
+    def parse_raw_data(self, raw_data: str) -> List[Release]:
+        return list(self.iter_releases(io.StringIO(raw_data)))
+
     @staticmethod
     def parse_version_and_tag(release_info: str) -> Optional[Tuple[str, str]]:
+        return AbstractReleaseParser.parse_version_and_tag_lines(
+            release_info.strip().split("\n")
+        )
+
+    @staticmethod
+    def parse_version_and_tag_lines(lines: List[str]) -> Optional[Tuple[str, str]]:
         version = None
         tag = None
-        release = release_info.strip()
-        for attr in release.split("\n"):
+        for attr in lines:
             parts = attr.split(": ")
             if len(parts) != 2:
                 continue
@@ -237,58 +792,180 @@ class ServerReleaseParser(AbstractReleaseParser):
     def get_source_urls(self) -> List[str]:
         return [HAZELCAST_SERVERS]
 
-    def parse_raw_data(self, raw_data: str) -> List[Release]:
-        stable_match = re.search(CURRENT_STABLE_SERVER_PATTERN, raw_data)
-        if not stable_match:
+    def iter_releases(self, lines: Iterable[str]) -> Iterator[Release]:
+        seen_current = False
+        seen_previous = False
+        for section, block in iter_release_blocks(lines):
+            if section == CURRENT_STABLE_SECTION:
+                # Only the first release of this section is the current stable one
+                if seen_current:
+                    continue
+                seen_current = True
+            elif section == PREVIOUS_STABLE_SECTION:
+                seen_previous = True
+            elif seen_previous:
+                # Sections after the previous stable ones are development releases
+                break
+            else:
+                continue
+
+            version_and_tag = self.parse_version_and_tag_lines(block)
+            if not version_and_tag:
+                continue
+
+            yield Release(*version_and_tag)
+
+        if not seen_current:
             raise ValueError(
                 "Cannot find a match on the server data "
                 "located at %s for the current stable version." % HAZELCAST_SERVERS
             )
 
-        previous_match = re.search(PREVIOUS_STABLE_SERVER_PATTERN, raw_data)
-        if not previous_match:
+        if not seen_previous:
             raise ValueError(
                 "Cannot find a match on the server data "
                 "located at %s for the previous stable versions." % HAZELCAST_SERVERS
             )
 
-        all_releases = []
-
-        for release in itertools.chain(
-            [stable_match.group(1).strip()],
-            previous_match.group(1).strip().split("---\n"),
-        ):
-            version_and_tag = self.parse_version_and_tag(release)
-            if version_and_tag:
-                all_releases.append(Release(*version_and_tag))
-
-        return all_releases
-
 
 class ClientReleaseParser(AbstractReleaseParser):
-    def __init__(self, kind: ClientKind, filters: List[ReleaseFilter]):
-        super(ClientReleaseParser, self).__init__(filters)
+    def __init__(
+        self,
+        kind: ClientKind,
+        filters: List[ReleaseFilter],
+        feed_cache: Optional[FeedCache] = None,
+    ):
+        super(ClientReleaseParser, self).__init__(filters, feed_cache)
         self._kind = kind
-        self._pattern = re.compile(CLIENT_HEADER % kind.value, re.DOTALL)
 
     def get_source_urls(self) -> List[str]:
         return [IMDG_CLIENTS]
 
-    def parse_raw_data(self, raw_data: str) -> List[Release]:
-        match = re.search(self._pattern, raw_data)
-        if not match:
+    def get_cache_key(self) -> str:
+        return "%s:%s" % (type(self).__name__, self._kind.name)
+
+    def iter_releases(self, lines: Iterable[str]) -> Iterator[Release]:
+        section_name = None
+        for section, block in iter_release_blocks(lines):
+            if section_name is None:
+                if get_client_kind_of_section(section) != self._kind:
+                    continue
+                section_name = section
+            elif section != section_name:
+                # The section of this client is over
+                return
+
+            version_and_tag = self.parse_version_and_tag_lines(block)
+            if not version_and_tag:
+                continue
+
+            yield ClientRelease(self._kind, *version_and_tag)
+
+        if section_name is None:
             raise ValueError(
                 "Cannot find a match on the clients data "
                 "located at %s for the %s client." % (IMDG_CLIENTS, self._kind.name)
             )
 
-        all_releases: List[Release] = []
-        for release in match.group(1).split("---\n"):
-            version_and_tag = self.parse_version_and_tag(release)
-            if version_and_tag:
-                all_releases.append(ClientRelease(self._kind, *version_and_tag))
 
-        return all_releases
+class AllClientsReleaseParser(AbstractReleaseParser):
+    def __init__(
+        self,
+        filters_by_kind: Dict[ClientKind, List[ReleaseFilter]],
+        feed_cache: Optional[FeedCache] = None,
+    ):
+        super(AllClientsReleaseParser, self).__init__([], feed_cache)
+        self._filters_by_kind = filters_by_kind
+
+    def get_source_urls(self) -> List[str]:
+        return [IMDG_CLIENTS]
+
+    def get_cache_key(self) -> str:
+        return "%s:%s" % (type(self).__name__, sorted(kind.name for kind in self._filters_by_kind))
+
+    def iter_releases(self, lines: Iterable[str]) -> Iterator[Release]:
+        found_kinds = set()
+        section_name = None
+        kind = None
+        for section, block in iter_release_blocks(lines):
+            if section != section_name:
+                section_name = section
+                if len(found_kinds) == len(self._filters_by_kind):
+                    break
+
+                kind = get_client_kind_of_section(section)
+                if kind not in self._filters_by_kind or kind in found_kinds:
+                    # Only the first section of a client is taken into account
+                    kind = None
+                    continue
+
+                found_kinds.add(kind)
+
+            if kind is None:
+                continue
+
+            version_and_tag = self.parse_version_and_tag_lines(block)
+            if not version_and_tag:
+                continue
+
+            yield ClientRelease(kind, *version_and_tag)
+
+        for kind in self._filters_by_kind:
+            if kind not in found_kinds:
+                raise ValueError(
+                    "Cannot find a match on the clients data "
+                    "located at %s for the %s client." % (IMDG_CLIENTS, kind.name)
+                )
+
+    def get_releases_by_kind(self) -> Dict[ClientKind, List[Release]]:
+        releases_by_kind: Dict[ClientKind, List[Release]] = {
+            kind: [] for kind in self._filters_by_kind
+        }
+        for release in self.get_all_releases():
+            releases = releases_by_kind.get(release.kind)
+            if releases is not None:
+                releases.append(release)
+
+        return {
+            kind: apply_filters(self._filters_by_kind[kind], releases)
+            for kind, releases in releases_by_kind.items()
+        }
+
+
+def get_client_kind_of_section(section: str) -> Optional[ClientKind]:
+    if not section.endswith(CLIENT_SECTION_SUFFIX):
+        return None
+
+    return get_client_kind(section[: -len(CLIENT_SECTION_SUFFIX)])
+
+
+def get_client_kind(client_name: str) -> Optional[ClientKind]:
+    for kind in ClientKind:
+        if re.fullmatch(kind.value, client_name):
+            return kind
+
+    return None
+
+
+def get_client_release_filters(kind: ClientKind) -> List[ReleaseFilter]:
+    if kind == ClientKind.GO:
+        filtered_major_version = [1]
+        unsupported_versions = [Version("1.0"), Version("1.1")]
+    elif kind == ClientKind.CPP:
+        filtered_major_version = [5]
+        unsupported_versions = [Version("5.0.0"), Version("5.1.0"), Version("5.2.0")]
+    elif kind == ClientKind.PY:
+        filtered_major_version = [5]
+        unsupported_versions = [Version("5.0.1"), Version("5.1")]
+    else:
+        filtered_major_version = [5]
+        unsupported_versions = []
+
+    return [
+        MajorVersionFilter(filtered_major_version),
+        StableReleaseFilter(),
+        SupportedReleaseFilter(unsupported_versions)
+    ]
 
 
 def get_tag(release: Release) -> str:
@@ -301,15 +978,13 @@ def get_tag(release: Release) -> str:
 
 
 def get_latest_patch_releases(releases: List[Release]) -> List[Release]:
-    major_to_minor_to_latest_patch: DefaultDict[
-        int, DefaultDict[int, Release]
-    ] = defaultdict(lambda: defaultdict(lambda: Release("0.0.0", "")))
+    major_to_minor_to_latest_patch: DefaultDict[int, Dict[int, Release]] = defaultdict(dict)
 
     for release in releases:
         version = release.version
         minor_to_latest_patch = major_to_minor_to_latest_patch[version.major]
-        latest_patch = minor_to_latest_patch[version.minor]
-        if latest_patch.version.patch <= version.patch:
+        latest_patch = minor_to_latest_patch.get(version.minor)
+        if latest_patch is None or latest_patch.version <= version:
             minor_to_latest_patch[version.minor] = release
 
     latest_patch_releases = []
@@ -321,43 +996,1356 @@ def get_latest_patch_releases(releases: List[Release]) -> List[Release]:
     return latest_patch_releases
 
 
+class ReleaseIndex:
+    # Keeps the releases sorted by version, so that range queries are
+    # answered by bisection. Releases with equal versions keep their
+    # original order and the last one of them wins, as it does in
+    # get_latest_patch_releases. All queries return the latest release
+    # first, which is the order of the release feeds.
+    def __init__(self, releases: Iterable[Release]):
+        self._releases = sorted(releases, key=lambda r: r.version)
+        self._versions = [r.version for r in self._releases]
+        # (major, minor) pairs in ascending order, along with the end
+        # index of their releases in the sorted list
+        self._minors: List[Tuple[int, int]] = []
+        self._minor_ends: List[int] = []
+        for i, version in enumerate(self._versions):
+            minor = (version.major, version.minor)
+            if self._minors and self._minors[-1] == minor:
+                self._minor_ends[-1] = i + 1
+            else:
+                self._minors.append(minor)
+                self._minor_ends.append(i + 1)
+
+    def __len__(self) -> int:
+        return len(self._releases)
+
+    def latest(self, stable_only: bool = False) -> Optional[Release]:
+        return next(self._iter_descending(0, len(self._releases), stable_only), None)
+
+    def between(
+        self,
+        min_version: Optional[Version] = None,
+        max_version: Optional[Version] = None,
+        stable_only: bool = False,
+    ) -> List[Release]:
+        # Both bounds are inclusive
+        start = 0 if min_version is None else bisect.bisect_left(self._versions, min_version)
+        end = (
+            len(self._versions)
+            if max_version is None
+            else bisect.bisect_right(self._versions, max_version)
+        )
+        return list(self._iter_descending(start, end, stable_only))
+
+    def between_minors(
+        self,
+        min_minor: Optional[Tuple[int, int]] = None,
+        max_minor: Optional[Tuple[int, int]] = None,
+        stable_only: bool = False,
+    ) -> List[Release]:
+        # Both bounds are inclusive, and cover all the patches of the minors
+        start_minor, end_minor = self._minor_range(min_minor, max_minor)
+        if start_minor >= end_minor:
+            return []
+
+        start = self._minor_ends[start_minor - 1] if start_minor > 0 else 0
+        end = self._minor_ends[end_minor - 1]
+        return list(self._iter_descending(start, end, stable_only))
+
+    def latest_minors(self, count: int, stable_only: bool = False) -> List[Release]:
+        releases = []
+        for i in reversed(range(len(self._minors))):
+            if len(releases) == count:
+                break
+
+            release = self._latest_of_minor(i, stable_only)
+            if release:
+                releases.append(release)
+
+        return releases
+
+    def latest_patch_per_minor(
+        self,
+        majors: Optional[Iterable[int]] = None,
+        min_minor: Optional[Tuple[int, int]] = None,
+        stable_only: bool = False,
+    ) -> List[Release]:
+        if majors is None:
+            ranges = [self._minor_range(min_minor, None)]
+        else:
+            ranges = [
+                self._minor_range(max((major, 0), min_minor or (major, 0)), (major, sys.maxsize))
+                for major in sorted(set(majors), reverse=True)
+            ]
+
+        releases = []
+        for start_minor, end_minor in ranges:
+            for i in reversed(range(start_minor, end_minor)):
+                release = self._latest_of_minor(i, stable_only)
+                if release:
+                    releases.append(release)
+
+        return releases
+
+    def _minor_range(
+        self, min_minor: Optional[Tuple[int, int]], max_minor: Optional[Tuple[int, int]]
+    ) -> Tuple[int, int]:
+        start = 0 if min_minor is None else bisect.bisect_left(self._minors, min_minor)
+        end = (
+            len(self._minors)
+            if max_minor is None
+            else bisect.bisect_right(self._minors, max_minor)
+        )
+        return start, end
+
+    def _latest_of_minor(self, i: int, stable_only: bool) -> Optional[Release]:
+        start = self._minor_ends[i - 1] if i > 0 else 0
+        return next(self._iter_descending(start, self._minor_ends[i], stable_only), None)
+
+    def _iter_descending(self, start: int, end: int, stable_only: bool) -> Iterator[Release]:
+        for i in range(end - 1, start - 1, -1):
+            release = self._releases[i]
+            if not stable_only or release.version.stable:
+                yield release
+
+
+class MatrixState:
+    # Records the (client tag, server version, server kind) combinations
+    # that were verified, so that the matrix scripts can emit only the
+    # ones involving releases that were not tested yet. Jobs that update
+    # the file concurrently must hold its lock, and reload it under the
+    # lock before adding their combinations and saving it.
+    def __init__(self, file_path: str):
+        self._file_path = file_path
+        self._verified: Set[Tuple[str, str, str]] = set()
+        self.reload()
+
+    def reload(self) -> None:
+        self._verified = set()
+        if not path.isfile(self._file_path):
+            return
+
+        with open(self._file_path, "r") as f:
+            data = json.load(f)
+
+        for combination in data.get("verified", []):
+            self._verified.add(
+                (
+                    combination["client_tag"],
+                    combination["server_version"],
+                    combination["server_kind"],
+                )
+            )
+
+    def lock(self) -> "FileLock":
+        return FileLock(self._file_path + ".lock")
+
+    def save(self) -> None:
+        data = {
+            "verified": [
+                {
+                    "client_tag": client_tag,
+                    "server_version": server_version,
+                    "server_kind": server_kind,
+                }
+                for client_tag, server_version, server_kind in sorted(self._verified)
+            ]
+        }
+        _write_atomically(self._file_path, json.dumps(data, indent=2).encode())
+
+    def is_verified(self, client_tag: str, server_version: str, server_kind: str) -> bool:
+        return (client_tag, server_version, server_kind) in self._verified
+
+    def mark_verified(self, client_tag: str, server_version: str, server_kind: str) -> None:
+        self._verified.add((client_tag, server_version, server_kind))
+
+    def get_untested_server_versions(
+        self,
+        server_versions: List[str],
+        server_kinds: List[str],
+        client_tag: Optional[str] = None,
+    ) -> List[str]:
+        # Without a client tag, a server version is untested until it is
+        # verified against any client for each of the server kinds.
+        if client_tag is None:
+            tested = {(s, k) for _, s, k in self._verified}
+        else:
+            tested = {(s, k) for c, s, k in self._verified if c == client_tag}
+
+        return [
+            version
+            for version in server_versions
+            if any((version, kind) not in tested for kind in server_kinds)
+        ]
+
+    def get_untested_client_tags(
+        self,
+        client_tags: List[str],
+        server_kinds: List[str],
+        server_version: Optional[str] = None,
+    ) -> List[str]:
+        # Without a server version, a client tag is untested until it is
+        # verified against any server for each of the server kinds.
+        if server_version is None:
+            tested = {(c, k) for c, _, k in self._verified}
+        else:
+            tested = {(c, k) for c, s, k in self._verified if s == server_version}
+
+        return [
+            tag
+            for tag in client_tags
+            if any((tag, kind) not in tested for kind in server_kinds)
+        ]
+
+
+def get_server_matrix_versions(minimum_version: str) -> List[str]:
+    minimum_major_version, minimum_minor_version = map(int, minimum_version.split("."))
+    minimum_minor = (minimum_major_version, minimum_minor_version)
+    filters: List[ReleaseFilter] = [MajorMinorVersionFilter(minimum_minor)]
+    server_release_parser = ServerReleaseParser(filters)
+    index = ReleaseIndex(server_release_parser.get_all_releases())
+    return [
+        release.version.version_str
+        for release in index.latest_patch_per_minor(min_minor=minimum_minor)
+    ]
+
+
+def parse_server_kinds(server_kinds: str) -> List[str]:
+    kinds = [kind.strip().lower() for kind in server_kinds.split(",") if kind.strip()]
+    for kind in kinds:
+        if kind.upper() not in ServerKind.__members__:
+            raise ValueError("Unknown server kind %s" % kind)
+
+    return kinds
+
+
+# Durations are read from a JSON object that maps matrix entries to the
+# number of seconds they took, or to a list of such samples.
+def load_durations(file_path: str) -> Dict[str, float]:
+    with open(file_path, "r") as f:
+        data = json.load(f)
+
+    durations = {}
+    for entry, duration in data.items():
+        if isinstance(duration, list):
+            if not duration:
+                continue
+            duration = sum(duration) / len(duration)
+        durations[entry] = float(duration)
+
+    return durations
+
+
+def shard_by_runtime(
+    entries: List[str], durations: Dict[str, float], shard_count: int
+) -> List[Dict]:
+    # Assigns the longest entries first, each to the shard with the lowest
+    # predicted runtime so far. Entries without any recorded duration are
+    # predicted to take the mean of the known ones.
+    if shard_count < 1:
+        raise ValueError("Shard count must be positive, got %s" % shard_count)
+
+    known = [durations[entry] for entry in entries if entry in durations]
+    default_duration = sum(known) / len(known) if known else 1.0
+    predicted = {entry: durations.get(entry, default_duration) for entry in entries}
+
+    order = {entry: i for i, entry in enumerate(entries)}
+    shards: List[List[str]] = [[] for _ in range(min(shard_count, len(entries)))]
+    heap = [(0.0, i) for i in range(len(shards))]
+    for entry in sorted(entries, key=lambda e: (-predicted[e], order[e])):
+        total, i = heapq.heappop(heap)
+        shards[i].append(entry)
+        heapq.heappush(heap, (total + predicted[entry], i))
+
+    result = []
+    for i, shard in enumerate(shards):
+        shard.sort(key=order.__getitem__)
+        result.append(
+            {
+                "shard": i,
+                "entries": shard,
+                "predicted_duration": round(sum(predicted[e] for e in shard), 3),
+            }
+        )
+
+    return result
+
+
+# Greedily selects combinations of the given parameter values so that
+# every pair of values of any two parameters is covered at least once.
+# The pinned combinations are always selected first. Each new combination
+# is seeded with the first uncovered pair, and its remaining values are
+# chosen to cover as many uncovered pairs as possible.
+def select_pairwise_combinations(
+    parameters: List[List[str]], pinned: Optional[List[Tuple[str, ...]]] = None
+) -> List[Tuple[str, ...]]:
+    parameter_count = len(parameters)
+    all_pairs = [
+        ((i, a), (j, b))
+        for i in range(parameter_count)
+        for j in range(i + 1, parameter_count)
+        for a in parameters[i]
+        for b in parameters[j]
+    ]
+    uncovered = set(all_pairs)
+
+    def pairs_of(combination: Tuple[str, ...]) -> Iterator:
+        for i in range(parameter_count):
+            for j in range(i + 1, parameter_count):
+                yield (i, combination[i]), (j, combination[j])
+
+    selected: List[Tuple[str, ...]] = []
+    for combination in pinned or []:
+        if combination not in selected:
+            selected.append(combination)
+            uncovered.difference_update(pairs_of(combination))
+
+    for pair in all_pairs:
+        if pair not in uncovered:
+            continue
+
+        (i, a), (j, b) = pair
+        values: List[Optional[str]] = [None] * parameter_count
+        values[i] = a
+        values[j] = b
+        for p in range(parameter_count):
+            if values[p] is not None:
+                continue
+
+            best_value = None
+            best_gain = -1
+            for value in parameters[p]:
+                gain = sum(
+                    1
+                    for q in range(parameter_count)
+                    if values[q] is not None
+                    and (((q, values[q]), (p, value)) if q < p else ((p, value), (q, values[q])))
+                    in uncovered
+                )
+                if gain > best_gain:
+                    best_value = value
+                    best_gain = gain
+            values[p] = best_value
+
+        combination = tuple(values)
+        selected.append(combination)
+        uncovered.difference_update(pairs_of(combination))
+
+    return selected
+
+
 class DownloadFailedError(Exception):
     pass
 
 
-def download_via_maven(
-    repo: str,
-    artifact_id: str,
-    version: str,
-    dst_folder: str,
-    is_test_artifact: bool = False,
-) -> None:
-    dst_file_name = artifact_id + "-" + version
+def get_artifact_file_name(artifact_id: str, version: str, is_test_artifact: bool = False) -> str:
+    file_name = artifact_id + "-" + version
     if is_test_artifact:
-        dst_file_name += "-tests"
-    dst_file_name += ".jar"
+        file_name += "-" + TEST_ARTIFACT_CLASSIFIER
+    return file_name + ".jar"
+
+
+def get_artifact_directory_url(
+    repo: str, artifact_id: str, version: str, mirrored: bool = True
+) -> str:
+    return "%s/%s/%s/%s/" % (
+        (get_mirrored_url(repo) if mirrored else repo).rstrip("/"),
+        MAVEN_GROUP_ID.replace(".", "/"),
+        artifact_id,
+        version,
+    )
+
+
+# The metadata is fetched once per process, as it is needed both to check
+# whether the local copy is up to date and to build the download URL.
+@functools.lru_cache(maxsize=None)
+def _fetch_snapshot_metadata(metadata_url: str) -> bytes:
+    with http_client.urlopen(metadata_url, timeout=ARTIFACT_DOWNLOAD_TIMEOUT, accept_gzip=True) as r:
+        return r.read()
+
+
+def resolve_snapshot_version(
+    repo: str, artifact_id: str, version: str, is_test_artifact: bool = False
+) -> str:
+    # Remote snapshot artifacts are stored with a timestamped version, such
+    # as 0.8-20240101.101010-3, which is listed in the metadata of the
+    # snapshot version directory.
+    metadata_url = get_artifact_directory_url(repo, artifact_id, version) + "maven-metadata.xml"
+    metadata = ElementTree.fromstring(_fetch_snapshot_metadata(metadata_url))
+
+    classifier = TEST_ARTIFACT_CLASSIFIER if is_test_artifact else ""
+    for snapshot_version in metadata.iterfind("./versioning/snapshotVersions/snapshotVersion"):
+        if (
+            snapshot_version.findtext("extension") == "jar"
+            and (snapshot_version.findtext("classifier") or "") == classifier
+        ):
+            value = snapshot_version.findtext("value")
+            if value:
+                return value
 
-    artifact = "com.hazelcast:" + artifact_id + ":" + version
-    if is_test_artifact:
-        artifact += ":jar:tests"
+    snapshot = metadata.find("./versioning/snapshot")
+    if snapshot is None:
+        raise ValueError("Cannot find the snapshot versions in %s" % metadata_url)
 
-    dst = path.join(dst_folder, dst_file_name)
-    if path.isfile(dst):
-        print("Not downloading %s, because it already exists." % dst_file_name)
-        return
+    if snapshot.findtext("localCopy") == "true":
+        return version
+
+    timestamp = snapshot.findtext("timestamp")
+    build_number = snapshot.findtext("buildNumber")
+    if not timestamp or not build_number:
+        raise ValueError("Cannot find the latest snapshot build in %s" % metadata_url)
+
+    return version[: -len(SNAPSHOT_SUFFIX)] + "-" + timestamp + "-" + build_number
+
+
+def get_artifact_url(
+    repo: str, artifact_id: str, version: str, is_test_artifact: bool = False
+) -> str:
+    file_version = version
+    if version.upper().endswith(SNAPSHOT_SUFFIX):
+        file_version = resolve_snapshot_version(repo, artifact_id, version, is_test_artifact)
+
+    return get_artifact_directory_url(repo, artifact_id, version) + get_artifact_file_name(
+        artifact_id, file_version, is_test_artifact
+    )
+
+
+class ChecksumMismatchError(Exception):
+    pass
+
+
+def is_not_found_error(error: BaseException) -> bool:
+    # Repositories report missing artifacts with a 404, and local mirrors
+    # with a missing file
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in (404, 410)
+    if isinstance(error, urllib.error.URLError):
+        return isinstance(error.reason, FileNotFoundError)
+
+    return isinstance(error, FileNotFoundError)
+
+
+def is_retryable_download_error(error: Exception) -> bool:
+    if is_not_found_error(error):
+        return False
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500 or error.code in (408, 429)
+
+    return isinstance(error, (urllib.error.URLError, OSError, http.client.HTTPException))
+
+
+def download_file(url: str, dst: str, expected_sha1: Optional[str] = None) -> str:
+    # Returns the SHA-1 of the downloaded file. The content is written to a
+    # partial file next to the destination, which is kept when the download
+    # fails, so that the next attempt or the next run only requests the
+    # missing bytes.
+    os.makedirs(path.dirname(path.abspath(dst)), exist_ok=True)
+    part_path = dst + PARTIAL_DOWNLOAD_SUFFIX
+    attempt = 0
+    while True:
+        try:
+            sha1 = _download_to_part_file(url, part_path)
+            if expected_sha1 is not None and sha1 != expected_sha1:
+                os.remove(part_path)
+                raise ChecksumMismatchError(
+                    "Checksum of %s is %s, but %s was expected." % (url, sha1, expected_sha1)
+                )
+            break
+        except (ChecksumMismatchError, urllib.error.URLError, OSError, http.client.HTTPException) as e:
+            # A mismatch may come from a corrupted partial file, which is
+            # removed above, so it is worth a fresh download.
+            retryable = isinstance(e, ChecksumMismatchError) or is_retryable_download_error(e)
+            if not retryable or attempt >= ARTIFACT_DOWNLOAD_RETRIES:
+                raise
+
+            delay = min(ARTIFACT_DOWNLOAD_BACKOFF * (2 ** attempt), ARTIFACT_DOWNLOAD_MAX_BACKOFF)
+            attempt += 1
+            print(
+                "Download of %s failed (%s), retrying in %.1f seconds (attempt %s of %s)."
+                % (url, e, delay, attempt, ARTIFACT_DOWNLOAD_RETRIES)
+            )
+            time.sleep(delay)
+
+    os.chmod(part_path, DOWNLOADED_FILE_MODE)
+    os.replace(part_path, dst)
+    return sha1
+
+
+def _download_to_part_file(url: str, part_path: str) -> str:
+    digest = hashlib.sha1()
+    offset = 0
+    if path.isfile(part_path):
+        with open(part_path, "rb") as f:
+            while True:
+                chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                offset += len(chunk)
+
+    headers = {}
+    if offset:
+        headers["Range"] = "bytes=%s-" % offset
+
+    try:
+        response = http_client.urlopen(url, headers, timeout=ARTIFACT_DOWNLOAD_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            # The partial file already has the whole content
+            return digest.hexdigest()
+        raise
+
+    with response:
+        # Servers that ignore the range, and local files, send the whole content
+        resumed = offset and response.getcode() == 206
+        if resumed:
+            content_range = response.headers.get("Content-Range", "")
+            match = re.match(r"bytes (\d+)-", content_range)
+            resumed = match is not None and int(match.group(1)) == offset
+
+        if resumed:
+            print("Resuming the download of %s from byte %s." % (url, offset))
+        else:
+            digest = hashlib.sha1()
+
+        received = 0
+        with open(part_path, "ab" if resumed else "wb") as f:
+            while True:
+                chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                received += len(chunk)
+
+        # Reads do not fail when the connection is closed early
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and received < int(content_length):
+            raise ConnectionError(
+                "Connection closed after %s of %s bytes." % (received, content_length)
+            )
+
+    return digest.hexdigest()
+
+
+def fetch_remote_sha1(url: str) -> Optional[str]:
+    try:
+        with http_client.urlopen(url + ".sha1", timeout=ARTIFACT_DOWNLOAD_TIMEOUT) as r:
+            content = r.read().decode().strip()
+    except urllib.error.URLError as e:
+        if is_not_found_error(e):
+            return None
+        raise
+
+    # Some repositories append the file name after the checksum
+    return content.split()[0].lower() if content else None
+
+
+def compute_sha1(file_path: str) -> str:
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileLock:
+    # An exclusive lock shared across processes, backed by a lock file.
+    # It is also exclusive across threads of the same process, as each
+    # acquisition opens its own file description.
+    def __init__(self, lock_path: str):
+        self._lock_path = lock_path
+        self._file = None
+
+    def __enter__(self) -> "FileLock":
+        os.makedirs(path.dirname(path.abspath(self._lock_path)), exist_ok=True)
+        self._file = open(self._lock_path, "a+b")
+        if IS_ON_WINDOWS:
+            import msvcrt
+
+            while True:
+                try:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *_) -> None:
+        if IS_ON_WINDOWS:
+            import msvcrt
+
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    # Hard links keep working even if the source is evicted from the cache.
+    # Across file systems the file is copied, as a symbolic link would break
+    # once the garbage collection, automatic or explicit, evicts the source.
+    directory = path.dirname(path.abspath(dst))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path.join(
+        directory, ".tmp-%s-%s-%s" % (os.getpid(), threading.get_ident(), path.basename(dst))
+    )
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+            os.chmod(tmp_path, DOWNLOADED_FILE_MODE)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    if not size:
+        return 0
+
+    multiplier = 1
+    for suffix, suffix_multiplier in (("K", 1 << 10), ("M", 1 << 20), ("G", 1 << 30)):
+        if size.endswith(suffix) or size.endswith(suffix + "B"):
+            size = size[: size.rindex(suffix)]
+            multiplier = suffix_multiplier
+            break
+
+    return int(float(size) * multiplier)
+
+
+def parse_versions(versions: str) -> List[str]:
+    versions = versions.strip()
+    if versions.startswith("["):
+        return [str(version) for version in json.loads(versions)]
+
+    return [version.strip() for version in versions.split(",") if version.strip()]
+
+
+class ArtifactCache:
+    # Artifacts are stored once per content under objects/, named after
+    # their SHA-1. The entries under coordinates/ map the Maven coordinates,
+    # with the resolved snapshot version if any, to the stored content.
+    # The modification time of an entry is its last use.
+    def __init__(
+        self, cache_dir: str, max_bytes: int = 0, pinned_versions: Iterable[str] = ()
+    ):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._pinned_versions = frozenset(pinned_versions)
+
+    def fetch(
+        self, repo: str, artifact_id: str, version: str, dst: str, is_test_artifact: bool = False
+    ) -> None:
+        url = get_artifact_url(repo, artifact_id, version, is_test_artifact)
+        coordinates = MAVEN_GROUP_ID + ":" + url.rsplit("/", 1)[-1]
+        downloaded = False
+        with self.lock(coordinates):
+            object_path = self.get_object_path(coordinates)
+            if object_path is None:
+                object_path = self._download(url, coordinates, artifact_id, version)
+                downloaded = True
+            else:
+                os.utime(self._entry_path(coordinates))
+            link_or_copy(object_path, dst)
+
+        if downloaded and self._max_bytes:
+            self.collect_garbage(self._max_bytes, self._pinned_versions | {version})
+
+    def fetch_locked(self, artifact: "LockedArtifact", dst: str) -> None:
+        # The content is known from the lockfile, so it is linked right away
+        # when any coordinates already stored it.
+        coordinates = MAVEN_GROUP_ID + ":" + artifact.url.rsplit("/", 1)[-1]
+        downloaded = False
+        with self.lock(coordinates):
+            object_path = self._object_path(artifact.sha1)
+            if path.isfile(object_path) and os.stat(object_path).st_size == artifact.size:
+                entry_path = self._entry_path(coordinates)
+                if path.isfile(entry_path):
+                    os.utime(entry_path)
+            else:
+                object_path = self._download(
+                    get_mirrored_url(artifact.url),
+                    coordinates,
+                    artifact.artifact_id,
+                    artifact.version,
+                    artifact.sha1,
+                )
+                downloaded = True
+            link_or_copy(object_path, dst)
+
+        if downloaded and self._max_bytes:
+            self.collect_garbage(self._max_bytes, self._pinned_versions | {artifact.version})
+
+    def get_size(self) -> int:
+        total = 0
+        for _, _, size, _ in self._iter_objects():
+            total += size
+        return total
+
+    def collect_garbage(self, max_bytes: int, pinned_versions: Iterable[str] = ()) -> Tuple[int, int]:
+        # Removes the least recently used contents until the cache fits into
+        # the given budget, and returns the number of removed contents along
+        # with the freed bytes. Contents referred by an entry of a pinned
+        # version are kept, even if the budget cannot be met without them.
+        pinned_versions = frozenset(pinned_versions)
+        removed_count = 0
+        freed_bytes = 0
+        with FileLock(path.join(self._cache_dir, "locks", "gc.lock")):
+            entries_by_sha1: DefaultDict[str, List[Tuple[str, Dict, float]]] = defaultdict(list)
+            for entry_path, entry, last_used in self._iter_entries():
+                entries_by_sha1[entry["sha1"]].append((entry_path, entry, last_used))
+
+            candidates = []
+            total = 0
+            for sha1, object_path, size, modified in self._iter_objects():
+                total += size
+                entries = entries_by_sha1.get(sha1, [])
+                if any(entry.get("version") in pinned_versions for _, entry, _ in entries):
+                    continue
+
+                last_used = max([modified] + [last_used for _, _, last_used in entries])
+                candidates.append((last_used, sha1, object_path, size, entries))
+
+            candidates.sort(key=lambda candidate: candidate[:2])
+            for _, sha1, object_path, size, entries in candidates:
+                if total <= max_bytes:
+                    break
+
+                # Hold the locks of the entries, so that the content is not
+                # removed while it is being linked somewhere.
+                with contextlib.ExitStack() as stack:
+                    for coordinates in sorted(entry["coordinates"] for _, entry, _ in entries):
+                        stack.enter_context(self.lock(coordinates))
+
+                    for entry_path, _, _ in entries:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(entry_path)
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(object_path)
+
+                total -= size
+                removed_count += 1
+                freed_bytes += size
+
+        return removed_count, freed_bytes
+
+    def _iter_entries(self) -> Iterator[Tuple[str, Dict, float]]:
+        coordinates_dir = path.join(self._cache_dir, "coordinates")
+        if not path.isdir(coordinates_dir):
+            return
+
+        for name in os.listdir(coordinates_dir):
+            entry_path = path.join(coordinates_dir, name)
+            try:
+                with open(entry_path, "r") as f:
+                    entry = json.load(f)
+                last_used = os.stat(entry_path).st_mtime
+            except (OSError, ValueError):
+                continue
+            yield entry_path, entry, last_used
+
+    def _iter_objects(self) -> Iterator[Tuple[str, str, int, float]]:
+        objects_dir = path.join(self._cache_dir, "objects")
+        if not path.isdir(objects_dir):
+            return
+
+        for prefix in os.listdir(objects_dir):
+            prefix_dir = path.join(objects_dir, prefix)
+            if not path.isdir(prefix_dir):
+                continue
+
+            for name in os.listdir(prefix_dir):
+                if not name.endswith(".jar"):
+                    continue
+
+                object_path = path.join(prefix_dir, name)
+                try:
+                    stat = os.stat(object_path)
+                except OSError:
+                    continue
+                yield name[: -len(".jar")], object_path, stat.st_size, stat.st_mtime
+
+    def lock(self, coordinates: str) -> FileLock:
+        return FileLock(path.join(self._cache_dir, "locks", self._entry_name(coordinates) + ".lock"))
+
+    def get_object_path(self, coordinates: str) -> Optional[str]:
+        entry = self._read_entry(coordinates)
+        if not entry:
+            return None
+
+        object_path = self._object_path(entry["sha1"])
+        try:
+            if os.stat(object_path).st_size != entry["size"]:
+                return None
+        except OSError:
+            return None
+
+        return object_path
+
+    def _download(
+        self,
+        url: str,
+        coordinates: str,
+        artifact_id: str,
+        version: str,
+        expected_sha1: Optional[str] = None,
+    ) -> str:
+        if expected_sha1 is None:
+            expected_sha1 = fetch_remote_sha1(url)
+        # The name of the temporary file is derived from the coordinates, so
+        # that an interrupted download is resumed by the next fetch.
+        objects_dir = self._ensure_dir(path.join(self._cache_dir, "objects"))
+        tmp_path = path.join(objects_dir, ".tmp-" + hashlib.sha256(coordinates.encode()).hexdigest())
+        try:
+            sha1 = download_file(url, tmp_path, expected_sha1)
+            if expected_sha1 is None:
+                print("No checksum is published for %s, it is not verified." % url)
+            object_path = self._object_path(sha1)
+            os.makedirs(path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+        except BaseException:
+            if path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        entry = {
+            "coordinates": coordinates,
+            "artifact_id": artifact_id,
+            "version": version,
+            "url": url,
+            "sha1": sha1,
+            "size": os.stat(object_path).st_size,
+        }
+        _write_atomically(self._entry_path(coordinates), json.dumps(entry).encode())
+        return object_path
+
+    def _read_entry(self, coordinates: str) -> Optional[Dict]:
+        try:
+            with open(self._entry_path(coordinates), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entry_path(self, coordinates: str) -> str:
+        return path.join(self._cache_dir, "coordinates", self._entry_name(coordinates) + ".json")
+
+    def _object_path(self, sha1: str) -> str:
+        return path.join(self._cache_dir, "objects", sha1[:2], sha1 + ".jar")
+
+    @staticmethod
+    def _entry_name(coordinates: str) -> str:
+        return hashlib.sha256(coordinates.encode()).hexdigest()
+
+    @staticmethod
+    def _ensure_dir(directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+
+def get_default_artifact_cache() -> Optional[ArtifactCache]:
+    if not ARTIFACT_CACHE_DIR:
+        return None
+
+    return ArtifactCache(
+        ARTIFACT_CACHE_DIR,
+        parse_size(ARTIFACT_CACHE_MAX_BYTES),
+        parse_versions(ARTIFACT_CACHE_PINNED_VERSIONS),
+    )
+
+
+class MissingArtifactCache:
+    # Records the artifacts that the repositories do not have, keyed by their
+    # unresolved coordinates, so that snapshots are recorded regardless of
+    # their latest build.
+    def __init__(self, cache_dir: str, ttl: float):
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+
+    def is_missing(self, coordinates: str) -> bool:
+        try:
+            with open(self._entry_path(coordinates), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        return time.time() - entry["checked_at"] < self._ttl
+
+    def mark_missing(self, coordinates: str) -> None:
+        entry = {"coordinates": coordinates, "checked_at": time.time()}
+        _write_atomically(self._entry_path(coordinates), json.dumps(entry).encode())
+
+    def _entry_path(self, coordinates: str) -> str:
+        return path.join(self._cache_dir, hashlib.sha256(coordinates.encode()).hexdigest() + ".json")
+
+
+def get_default_missing_artifact_cache() -> Optional[MissingArtifactCache]:
+    if not ARTIFACT_CACHE_DIR or MISSING_ARTIFACT_TTL <= 0:
+        return None
+
+    return MissingArtifactCache(path.join(ARTIFACT_CACHE_DIR, "missing"), MISSING_ARTIFACT_TTL)
+
+
+def get_artifact_coordinates(
+    repo: str, artifact_id: str, version: str, is_test_artifact: bool = False
+) -> str:
+    return get_artifact_directory_url(repo, artifact_id, version) + get_artifact_file_name(
+        artifact_id, version, is_test_artifact
+    )
+
+
+def artifact_exists(
+    repo: str, artifact_id: str, version: str, is_test_artifact: bool = False
+) -> bool:
+    # Probes the repository with a HEAD request, which is much cheaper than a
+    # failing Maven invocation. Errors other than a missing artifact are
+    # raised, as they do not tell whether the artifact exists.
+    try:
+        url = get_artifact_url(repo, artifact_id, version, is_test_artifact)
+        if is_local_url(url):
+            return path.isfile(urllib.request.url2pathname(urlparse(url).path))
+
+        with http_client.urlopen(url, method="HEAD", timeout=ARTIFACT_DOWNLOAD_TIMEOUT):
+            return True
+    except urllib.error.HTTPError as e:
+        if e.code in (404, 410):
+            return False
+        raise
+
+
+def download_natively(
+    repo: str, artifact_id: str, version: str, dst: str, is_test_artifact: bool = False
+) -> None:
+    url = get_artifact_url(repo, artifact_id, version, is_test_artifact)
+    expected_sha1 = fetch_remote_sha1(url)
+    download_file(url, dst, expected_sha1)
+    if expected_sha1 is None:
+        print("No checksum is published for %s, it is not verified." % url)
+
+
+def download_via_mvn(
+    repo: str, artifact_id: str, version: str, dst: str, is_test_artifact: bool = False
+) -> None:
+    artifact = MAVEN_GROUP_ID + ":" + artifact_id + ":" + version
+    if is_test_artifact:
+        artifact += ":jar:" + TEST_ARTIFACT_CLASSIFIER
 
     args = [
         "mvn",
         "-q",
         "org.apache.maven.plugins:maven-dependency-plugin:2.10:get",
         "-Dtransitive=false",
-        "-DremoteRepositories=" + repo,
+        "-DremoteRepositories=" + get_mirrored_url(repo),
         "-Dartifact=" + artifact,
         "-Ddest=" + dst,
     ]
 
-    print("Downloading " + dst_file_name)
     p = subprocess.run(args, shell=IS_ON_WINDOWS)
     if p.returncode != 0:
-        print("Failed to download " + dst_file_name)
         raise DownloadFailedError()
+
+
+def get_snapshot_build(file_path: str) -> Optional[str]:
+    try:
+        with open(file_path + SNAPSHOT_BUILD_SUFFIX, "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def set_snapshot_build(file_path: str, snapshot_build: Optional[str]) -> None:
+    build_path = file_path + SNAPSHOT_BUILD_SUFFIX
+    if snapshot_build is None:
+        if path.exists(build_path):
+            os.remove(build_path)
+        return
+
+    _write_atomically(build_path, snapshot_build.encode())
+
+
+def download_via_maven(
+    repo: str,
+    artifact_id: str,
+    version: str,
+    dst_folder: str,
+    is_test_artifact: bool = False,
+    optional: bool = False,
+) -> None:
+    dst_file_name = get_artifact_file_name(artifact_id, version, is_test_artifact)
+
+    dst = path.join(dst_folder, dst_file_name)
+    snapshot_build = None
+    if version.upper().endswith(SNAPSHOT_SUFFIX):
+        try:
+            snapshot_build = resolve_snapshot_version(repo, artifact_id, version, is_test_artifact)
+        except (urllib.error.URLError, OSError, ValueError, ElementTree.ParseError) as e:
+            if path.isfile(dst):
+                print("Failed to check the latest build of %s (%s), using the existing one." % (dst_file_name, e))
+                return
+            # Let the download report the error
+
+        if path.isfile(dst) and get_snapshot_build(dst) == snapshot_build:
+            print("Not downloading %s, because build %s is up to date." % (dst_file_name, snapshot_build))
+            return
+    elif path.isfile(dst):
+        print("Not downloading %s, because it already exists." % dst_file_name)
+        return
+
+    # Only optional artifacts are expected to be missing. A required one
+    # might just not be published yet, and must not be skipped for the TTL.
+    missing_artifact_cache = get_default_missing_artifact_cache() if optional else None
+    coordinates = get_artifact_coordinates(repo, artifact_id, version, is_test_artifact)
+    if missing_artifact_cache and missing_artifact_cache.is_missing(coordinates):
+        print("Not downloading %s, because it is known to be missing." % dst_file_name)
+        raise DownloadFailedError()
+
+    print("Downloading " + dst_file_name)
+    if MAVEN_RESOLVER != "mvn":
+        try:
+            artifact_cache = get_default_artifact_cache()
+            if artifact_cache:
+                artifact_cache.fetch(repo, artifact_id, version, dst, is_test_artifact)
+            else:
+                download_natively(repo, artifact_id, version, dst, is_test_artifact)
+            set_snapshot_build(dst, snapshot_build)
+            return
+        except (urllib.error.URLError, FileNotFoundError) as e:
+            if is_not_found_error(e):
+                # The artifact does not exist, Maven would not find it either
+                print("Failed to download " + dst_file_name)
+                if missing_artifact_cache:
+                    missing_artifact_cache.mark_missing(coordinates)
+                raise DownloadFailedError() from e
+            error: Exception = e
+        except (
+            OSError,
+            ValueError,
+            ElementTree.ParseError,
+            http.client.HTTPException,
+            ChecksumMismatchError,
+        ) as e:
+            error = e
+
+        if not shutil.which("mvn"):
+            print("Failed to download %s: %s" % (dst_file_name, error))
+            raise DownloadFailedError() from error
+
+        print("Failed to download %s (%s), retrying with Maven." % (dst_file_name, error))
+    elif missing_artifact_cache:
+        try:
+            exists = artifact_exists(repo, artifact_id, version, is_test_artifact)
+        except (urllib.error.URLError, OSError, ValueError, ElementTree.ParseError) as e:
+            # Let Maven decide
+            print("Failed to check whether %s exists: %s" % (dst_file_name, e))
+            exists = True
+
+        if not exists:
+            print("Failed to download %s, because it does not exist." % dst_file_name)
+            missing_artifact_cache.mark_missing(coordinates)
+            raise DownloadFailedError()
+
+    try:
+        download_via_mvn(repo, artifact_id, version, dst, is_test_artifact)
+    except DownloadFailedError:
+        print("Failed to download " + dst_file_name)
+        raise
+
+    set_snapshot_build(dst, snapshot_build)
+
+
+class ArtifactRequest:
+    def __init__(
+        self,
+        repo: str,
+        artifact_id: str,
+        version: str,
+        is_test_artifact: bool = False,
+        optional: bool = False,
+    ):
+        self.repo = repo
+        self.artifact_id = artifact_id
+        self.version = version
+        self.is_test_artifact = is_test_artifact
+        self.optional = optional
+
+    @property
+    def file_name(self) -> str:
+        return get_artifact_file_name(self.artifact_id, self.version, self.is_test_artifact)
+
+    def __repr__(self) -> str:
+        return "ArtifactRequest(repo=%s, artifact_id=%s, version=%s, is_test_artifact=%s, optional=%s)" % (
+            self.repo,
+            self.artifact_id,
+            self.version,
+            self.is_test_artifact,
+            self.optional,
+        )
+
+
+def download_artifacts(
+    requests: List[ArtifactRequest],
+    dst_folder: str,
+    max_workers: int = ARTIFACT_DOWNLOAD_MAX_WORKERS,
+) -> List[str]:
+    # Downloads all the requested artifacts concurrently and returns the
+    # names of the files that are present afterwards. Missing optional
+    # artifacts are skipped, but a missing required one fails the whole
+    # plan once all the other downloads are over.
+    unique_requests: Dict[str, ArtifactRequest] = {}
+    for request in requests:
+        existing = unique_requests.get(request.file_name)
+        if existing is None or existing.optional:
+            unique_requests[request.file_name] = request
+
+    def download(request: ArtifactRequest) -> None:
+        download_via_maven(
+            request.repo,
+            request.artifact_id,
+            request.version,
+            dst_folder,
+            request.is_test_artifact,
+            request.optional,
+        )
+
+    workers = max(1, min(max_workers, len(unique_requests)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (request, executor.submit(download, request)) for request in unique_requests.values()
+        ]
+
+    file_names = []
+    failed_requests = []
+    for request, future in futures:
+        error = future.exception()
+        if error is None:
+            file_names.append(request.file_name)
+        elif request.optional and isinstance(error, DownloadFailedError):
+            print("Skipping the optional artifact %s, as it is not available." % request.file_name)
+        else:
+            failed_requests.append((request, error))
+
+    if failed_requests:
+        for request, error in failed_requests:
+            print("Failed to download the required artifact %s: %r" % (request.file_name, error))
+        raise DownloadFailedError() from failed_requests[0][1]
+
+    return file_names
+
+
+def get_server_artifact_requests(version: str, server_kind: ServerKind) -> List[ArtifactRequest]:
+    if version.upper().endswith(SNAPSHOT_SUFFIX):
+        repo = SNAPSHOT_REPO
+        enterprise_repo = ENTERPRISE_SNAPSHOT_REPO
+    else:
+        repo = RELEASE_REPO
+        enterprise_repo = ENTERPRISE_RELEASE_REPO
+
+    requests = [
+        ArtifactRequest(repo, "hazelcast", version, is_test_artifact=True),
+        # SQL JAR might not exist on 4.0.x
+        ArtifactRequest(repo, "hazelcast-sql", version, optional=True),
+    ]
+
+    if server_kind == ServerKind.ENTERPRISE:
+        requests.append(ArtifactRequest(enterprise_repo, "hazelcast-enterprise", version))
+    else:
+        requests.append(ArtifactRequest(repo, "hazelcast", version))
+
+    return requests
+
+
+def get_rc_artifact_requests(rc_version: str) -> List[ArtifactRequest]:
+    return [ArtifactRequest(ENTERPRISE_SNAPSHOT_REPO, "hazelcast-remote-controller", rc_version)]
+
+
+# Lockfiles record the resolved URL, size and SHA-1 of the artifacts of
+# each server version and kind, and of each remote controller version, so
+# that the jobs can download them without any metadata lookups. The URLs
+# are recorded without the mirror, which is applied when downloading.
+LOCKFILE_FORMAT = 1
+
+
+def get_server_lock_key(version: str, server_kind: ServerKind) -> str:
+    return "server/%s/%s" % (version, server_kind.name.lower())
+
+
+def get_rc_lock_key(rc_version: str) -> str:
+    return "rc/%s" % rc_version
+
+
+class LockedArtifact:
+    def __init__(
+        self, file_name: str, artifact_id: str, version: str, url: str, size: int, sha1: str
+    ):
+        self.file_name = file_name
+        self.artifact_id = artifact_id
+        self.version = version
+        self.url = url
+        self.size = size
+        self.sha1 = sha1
+
+    def to_json(self) -> Dict:
+        return {
+            "file_name": self.file_name,
+            "artifact_id": self.artifact_id,
+            "version": self.version,
+            "url": self.url,
+            "size": self.size,
+            "sha1": self.sha1,
+        }
+
+    @staticmethod
+    def from_json(data: Dict) -> "LockedArtifact":
+        return LockedArtifact(
+            data["file_name"],
+            data["artifact_id"],
+            data["version"],
+            data["url"],
+            int(data["size"]),
+            data["sha1"],
+        )
+
+    def __repr__(self) -> str:
+        return "LockedArtifact(file_name=%s, url=%s, size=%s, sha1=%s)" % (
+            self.file_name,
+            self.url,
+            self.size,
+            self.sha1,
+        )
+
+
+def fetch_remote_size(url: str) -> Optional[int]:
+    if is_local_url(url):
+        return os.stat(urllib.request.url2pathname(urlparse(url).path)).st_size
+
+    with http_client.urlopen(url, method="HEAD", timeout=ARTIFACT_DOWNLOAD_TIMEOUT) as r:
+        content_length = r.headers.get("Content-Length")
+    return int(content_length) if content_length is not None else None
+
+
+def lock_artifact(request: ArtifactRequest) -> Optional[LockedArtifact]:
+    # Returns None for the optional artifacts that do not exist. The size
+    # and the checksum are taken from the repository when it publishes
+    # them, otherwise the artifact is downloaded to compute them.
+    try:
+        url = get_artifact_url(request.repo, request.artifact_id, request.version, request.is_test_artifact)
+        sha1 = fetch_remote_sha1(url)
+        size = fetch_remote_size(url)
+        if sha1 is None or size is None:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                tmp_path = path.join(tmp_dir, request.file_name)
+                sha1 = download_file(url, tmp_path, sha1)
+                size = os.stat(tmp_path).st_size
+    except (urllib.error.URLError, FileNotFoundError) as e:
+        if is_not_found_error(e) and request.optional:
+            print("Not locking the optional artifact %s, as it is not available." % request.file_name)
+            return None
+        raise
+
+    remote_file_name = url.rsplit("/", 1)[-1]
+    canonical_url = (
+        get_artifact_directory_url(request.repo, request.artifact_id, request.version, mirrored=False)
+        + remote_file_name
+    )
+    return LockedArtifact(
+        request.file_name, request.artifact_id, request.version, canonical_url, size, sha1
+    )
+
+
+def lock_artifacts(
+    requests_by_key: Dict[str, List[ArtifactRequest]],
+    max_workers: int = ARTIFACT_DOWNLOAD_MAX_WORKERS,
+) -> Dict[str, List[LockedArtifact]]:
+    unique_requests: Dict[str, ArtifactRequest] = {}
+    for requests in requests_by_key.values():
+        for request in requests:
+            unique_requests.setdefault(request.file_name, request)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        locked = dict(
+            zip(unique_requests, executor.map(lock_artifact, unique_requests.values()))
+        )
+
+    return {
+        key: [locked[request.file_name] for request in requests if locked[request.file_name]]
+        for key, requests in requests_by_key.items()
+    }
+
+
+def save_lockfile(file_path: str, artifacts_by_key: Dict[str, List[LockedArtifact]]) -> None:
+    data = {
+        "format": LOCKFILE_FORMAT,
+        "artifacts": {
+            key: [artifact.to_json() for artifact in artifacts]
+            for key, artifacts in sorted(artifacts_by_key.items())
+        },
+    }
+    _write_atomically(file_path, (json.dumps(data, indent=2) + "\n").encode())
+
+
+def load_lockfile(file_path: str) -> Dict[str, List[LockedArtifact]]:
+    with open(file_path, "r") as f:
+        data = json.load(f)
+
+    if data.get("format") != LOCKFILE_FORMAT:
+        raise ValueError("Unsupported lockfile format in %s" % file_path)
+
+    return {
+        key: [LockedArtifact.from_json(artifact) for artifact in artifacts]
+        for key, artifacts in data["artifacts"].items()
+    }
+
+
+def download_locked_artifacts(
+    artifacts: List[LockedArtifact],
+    dst_folder: str,
+    max_workers: int = ARTIFACT_DOWNLOAD_MAX_WORKERS,
+) -> List[str]:
+    # Downloads the artifacts from their locked URLs, or keeps the existing
+    # files, verifying all of them against their locked checksums in parallel.
+    def download(artifact: LockedArtifact) -> None:
+        dst = path.join(dst_folder, artifact.file_name)
+        if (
+            path.isfile(dst)
+            and os.stat(dst).st_size == artifact.size
+            and compute_sha1(dst) == artifact.sha1
+        ):
+            print("Not downloading %s, because it is verified." % artifact.file_name)
+            return
+
+        print("Downloading " + artifact.file_name)
+        artifact_cache = get_default_artifact_cache()
+        if artifact_cache:
+            artifact_cache.fetch_locked(artifact, dst)
+        else:
+            download_file(get_mirrored_url(artifact.url), dst, artifact.sha1)
+
+    workers = max(1, min(max_workers, len(artifacts)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(artifact, executor.submit(download, artifact)) for artifact in artifacts]
+
+    failed_artifacts = [(artifact, future.exception()) for artifact, future in futures if future.exception()]
+    if failed_artifacts:
+        for artifact, error in failed_artifacts:
+            print("Failed to download the locked artifact %s: %r" % (artifact.file_name, error))
+        raise DownloadFailedError() from failed_artifacts[0][1]
+
+    return [artifact.file_name for artifact in artifacts]